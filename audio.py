@@ -0,0 +1,278 @@
+"""Áudio do preview decodificado em streaming.
+
+O ffmpeg (o empacotado pelo imageio-ffmpeg, ou o do PATH) decodifica a trilha
+do vídeo para PCM no formato do mixer, gravando no cache em disco em segundo
+plano (DecodedAudio). A reprodução (AudioStream) lê esse PCM em blocos
+enquanto ele é gerado e os enfileira em um pygame.mixer.Channel, começando
+assim que o primeiro bloco fica pronto. Reproduções seguintes do mesmo
+arquivo leem direto do cache, sem decodificar de novo.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pygame
+
+import cache
+
+try:
+    import imageio_ffmpeg
+except ImportError:
+    imageio_ffmpeg = None
+
+# Duração de cada bloco enviado ao mixer
+CHUNK_SECONDS = 0.5
+# Espaço máximo ocupado pelo PCM em cache
+AUDIO_CACHE_MAX_BYTES = 4 * 1024 ** 3
+# Formatos de amostra do pygame.mixer -> formato PCM do ffmpeg
+SAMPLE_FORMATS = {-16: 's16le', 16: 'u16le', -8: 's8', 8: 'u8', 32: 'f32le'}
+
+_decoded_audio = {}
+_decoded_audio_lock = threading.Lock()
+
+
+def find_ffmpeg():
+    """Caminho do executável do ffmpeg, ou None se não houver"""
+    if imageio_ffmpeg is not None:
+        try:
+            return imageio_ffmpeg.get_ffmpeg_exe()
+        except RuntimeError:
+            pass
+    return shutil.which('ffmpeg')
+
+
+class DecodedAudio:
+    """PCM de um vídeo, decodificado em segundo plano para um arquivo do cache.
+
+    O arquivo só é considerado completo (e reaproveitado em outras sessões)
+    quando o marcador ``.done`` existe.
+    """
+
+    def __init__(self, video_path, sample_rate, sample_format, channels):
+        self.video_path = video_path
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.channels = channels
+        self.frame_bytes = channels * abs(sample_format) // 8
+        self.path = cache.cache_path('audio', video_path, '.pcm', sample_rate, sample_format, channels)
+        self.done_path = self.path + '.done'
+        self.failed = False
+        self._size = 0
+        self._complete = False
+        self._condition = threading.Condition()
+        self._process = None
+        if os.path.exists(self.done_path) and os.path.exists(self.path):
+            self._size = os.path.getsize(self.path)
+            self._complete = True
+        else:
+            if os.path.exists(self.done_path):
+                os.remove(self.done_path)
+            # Criado já aqui para que a reprodução possa abri-lo antes do primeiro bloco
+            output = open(self.path, 'wb')
+            threading.Thread(target=self._decode, args=(output,), daemon=True).start()
+
+    @property
+    def complete(self):
+        return self._complete
+
+    def _decode(self, output):
+        ffmpeg = find_ffmpeg()
+        try:
+            if ffmpeg is None:
+                raise RuntimeError("ffmpeg não encontrado")
+            cache.prune('audio', AUDIO_CACHE_MAX_BYTES, keep=(self.path,))
+            command = [ffmpeg, '-nostdin', '-v', 'error', '-i', self.video_path, '-vn',
+                       '-f', SAMPLE_FORMATS[self.sample_format], '-ar', str(self.sample_rate),
+                       '-ac', str(self.channels), '-']
+            creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+            self._process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                             creationflags=creationflags)
+            with output as f:
+                while True:
+                    data = self._process.stdout.read(256 * 1024)
+                    if not data:
+                        break
+                    f.write(data)
+                    f.flush()
+                    with self._condition:
+                        self._size += len(data)
+                        self._condition.notify_all()
+            if self._process.wait() == 0:
+                open(self.done_path, 'wb').close()
+            elif self._size == 0:
+                self.failed = True  # Sem trilha de áudio ou arquivo ilegível
+        except Exception as e:
+            print(f"Erro ao decodificar o áudio: {e}")
+            self.failed = True
+        finally:
+            with self._condition:
+                self._complete = True
+                self._condition.notify_all()
+
+    def cancel(self):
+        """Interrompe a decodificação em andamento"""
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+
+    def read(self, f, offset, size, stop_event):
+        """Lê até ``size`` bytes a partir de ``offset``, aguardando a decodificação se necessário.
+
+        Retorna b'' no fim da trilha (ou se ``stop_event`` for sinalizado).
+        """
+        with self._condition:
+            while self._size < offset + size and not self._complete:
+                if stop_event.is_set():
+                    return b''
+                self._condition.wait(0.05)
+            available = min(size, self._size - offset)
+        if available <= 0:
+            return b''
+        f.seek(offset)
+        return f.read(available - available % self.frame_bytes)
+
+    def duration(self, size):
+        return size / (self.frame_bytes * self.sample_rate)
+
+
+def open_audio(video_path):
+    """DecodedAudio do vídeo no formato do mixer atual (compartilhado entre reproduções)"""
+    mixer = pygame.mixer.get_init()
+    if mixer is None or find_ffmpeg() is None:
+        return None
+    sample_rate, sample_format, channels = mixer
+    if sample_format not in SAMPLE_FORMATS:
+        return None
+    key = (os.path.abspath(video_path), cache.file_key(video_path), mixer)
+    with _decoded_audio_lock:
+        decoded = _decoded_audio.get(key)
+        if decoded is None or decoded.failed:
+            decoded = _decoded_audio[key] = DecodedAudio(video_path, sample_rate, sample_format, channels)
+        return decoded
+
+
+class AudioStream:
+    """Reproduz um DecodedAudio em blocos por um pygame.mixer.Channel.
+
+    ``position()`` informa os segundos tocados desde o último ``play`` (ou None
+    quando não há áudio tocando), para o relógio de sincronia do preview.
+    """
+
+    def __init__(self, decoded):
+        self.decoded = decoded
+        self.channel = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._reset()
+
+    def _reset(self):
+        self._played = 0.0  # Duração dos blocos já tocados por completo
+        self._current = None  # (duração, instante em que começou) do bloco tocando
+        self._queued = None  # Duração do bloco enfileirado no canal
+        self._paused_at = None
+        self._finished = False
+
+    def play(self, start=0.0):
+        """Começa (ou recomeça) a reprodução a partir de ``start`` segundos da trilha"""
+        self.stop()
+        with self._lock:
+            self._reset()
+        self._stop_event = threading.Event()
+        self.channel = pygame.mixer.find_channel(True)
+        offset = int(max(0.0, start) * self.decoded.sample_rate) * self.decoded.frame_bytes
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event, offset), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.channel is not None:
+            self.channel.stop()
+
+    def pause(self):
+        with self._lock:
+            if self._paused_at is None:
+                self._paused_at = time.monotonic()
+                if self.channel is not None:
+                    self.channel.pause()
+
+    def resume(self):
+        with self._lock:
+            if self._paused_at is not None:
+                if self._current is not None:
+                    duration, started = self._current
+                    self._current = (duration, started + time.monotonic() - self._paused_at)
+                self._paused_at = None
+                if self.channel is not None:
+                    self.channel.unpause()
+
+    def position(self):
+        with self._lock:
+            if self._finished or self.channel is None:
+                return None
+            position = self._played
+            if self._current is not None:
+                duration, started = self._current
+                position += min((self._paused_at or time.monotonic()) - started, duration)
+            return position
+
+    def _update_position(self):
+        # Promove o bloco enfileirado quando o mixer passa a tocá-lo
+        now = time.monotonic()
+        with self._lock:
+            if self._paused_at is not None:
+                return
+            if self._queued is not None and self.channel.get_queue() is None:
+                if self._current is not None:
+                    self._played += self._current[0]
+                self._current = (self._queued, now)
+                self._queued = None
+            if self._current is not None and not self.channel.get_busy():
+                self._played += self._current[0]
+                self._current = None
+
+    def _run(self, stop_event, offset):
+        chunk_bytes = int(self.decoded.sample_rate * CHUNK_SECONDS) * self.decoded.frame_bytes
+        pending = None
+        sounds = []  # Referências aos blocos tocando/enfileirados
+        try:
+            with open(self.decoded.path, 'rb') as f:
+                while not stop_event.is_set():
+                    self._update_position()
+                    if pending is None:
+                        data = self.decoded.read(f, offset, chunk_bytes, stop_event)
+                        if not data:
+                            break
+                        offset += len(data)
+                        pending = (pygame.mixer.Sound(buffer=data), self.decoded.duration(len(data)))
+                    sent = False
+                    with self._lock:
+                        if self._paused_at is None:
+                            if not self.channel.get_busy():
+                                # Primeiro bloco (ou o mixer esvaziou): toca imediatamente
+                                self.channel.play(pending[0])
+                                self._current = (pending[1], time.monotonic())
+                                sent = True
+                            elif self._queued is None and self.channel.get_queue() is None:
+                                self.channel.queue(pending[0])
+                                self._queued = pending[1]
+                                sent = True
+                    if sent:
+                        sounds = sounds[-1:] + [pending[0]]
+                        pending = None
+                    else:
+                        time.sleep(0.01)
+                # Aguarda o fim dos blocos já enviados ao mixer
+                while not stop_event.is_set() and (self.channel.get_busy() or self._paused_at is not None):
+                    self._update_position()
+                    time.sleep(0.01)
+        except Exception as e:
+            print(f"Erro na reprodução do áudio: {e}")
+        finally:
+            with self._lock:
+                self._finished = True
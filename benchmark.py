@@ -0,0 +1,101 @@
+"""Benchmark dos formatos de saída da extração de frames.
+
+    python benchmark.py clip_referencia.mp4 --frames 300 --json resultado.json
+
+Para cada configuração de BENCHMARK_SETTINGS os mesmos frames do clipe são
+extraídos para uma pasta temporária, e são reportados frames/s e bytes/frame.
+Para medir também preview, seek e abertura em clipes sintéticos, ver benchsuite.py.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from extractor import DEFAULT_WORKERS, FrameExtractor
+
+# (formato, qualidade) avaliados por padrão
+BENCHMARK_SETTINGS = [
+    ('tiff', None),
+    ('tiff-lzw', None),
+    ('tiff-raw', None),
+    ('png', 1),
+    ('png', 3),
+    ('png', 9),
+    ('jpg', 85),
+    ('jpg', 95),
+    ('webp', 80),
+    ('webp', 95),
+    ('npy', None),
+]
+
+
+def directory_size(path):
+    """Soma o tamanho em bytes dos arquivos de uma pasta"""
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file():
+            total += entry.stat().st_size
+    return total
+
+
+def benchmark_format(video_path, image_format, quality=None, frames=None, workers=DEFAULT_WORKERS,
+                     processes=1, scratch_dir=None):
+    """Extrai ``frames`` frames no formato indicado e mede vazão e tamanho médio"""
+    output_root = tempfile.mkdtemp(prefix='vid_bench_', dir=scratch_dir)
+    try:
+        stats = FrameExtractor(video_path, output_root, image_format=image_format, quality=quality,
+                               end_frame=frames, workers=workers, processes=processes).run()
+        size = directory_size(stats.output_dir)
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+    return {
+        'format': image_format,
+        'quality': quality,
+        'frames': stats.frames_written,
+        'elapsed': stats.elapsed,
+        'frames_per_second': stats.frames_per_second,
+        'bytes_per_frame': size / stats.frames_written if stats.frames_written else 0,
+    }
+
+
+def parse_setting(value):
+    """Converte 'formato' ou 'formato:qualidade' em (formato, qualidade)"""
+    image_format, _, quality = value.partition(':')
+    return image_format, int(quality) if quality else None
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Mede frames/s e bytes/frame de cada formato de saída.")
+    parser.add_argument('video', help="Clipe de referência")
+    parser.add_argument('-n', '--frames', type=int, default=300, help="Frames extraídos por configuração")
+    parser.add_argument('-s', '--setting', dest='settings', action='append', type=parse_setting,
+                        help="Configuração 'formato[:qualidade]' (pode repetir; padrão: todas)")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="Threads de gravação")
+    parser.add_argument('-p', '--processes', type=int, default=1, help="Processos de decodificação")
+    parser.add_argument('--scratch-dir', default=None,
+                        help="Pasta onde os frames são gravados durante o teste (padrão: pasta temporária)")
+    parser.add_argument('--json', dest='json_path', default=None, help="Grava os resultados neste arquivo JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    results = []
+    print(f"{'formato':<10} {'qualidade':>9} {'frames/s':>10} {'KB/frame':>10}")
+    for image_format, quality in args.settings or BENCHMARK_SETTINGS:
+        result = benchmark_format(args.video, image_format, quality, args.frames, args.workers,
+                                  args.processes, args.scratch_dir)
+        results.append(result)
+        quality_text = '-' if quality is None else str(quality)
+        print(f"{image_format:<10} {quality_text:>9} {result['frames_per_second']:>10.1f} "
+              f"{result['bytes_per_frame'] / 1024:>10.1f}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'video': args.video, 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
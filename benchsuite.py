@@ -0,0 +1,514 @@
+"""Suíte de benchmarks reprodutível, com vídeos sintéticos gerados localmente.
+
+    python benchsuite.py run --json base.json             # gera os clipes e mede
+    python benchsuite.py run --json novo.json --quick     # subconjunto rápido
+    python benchsuite.py compare base.json novo.json      # compara duas execuções
+
+Os clipes de CLIP_SPECS (resoluções, fps, codecs do OpenCV e durações
+variadas) são gerados uma vez no cache do usuário (ver cache.py) e
+reaproveitados; codecs que o OpenCV instalado não grava são pulados. O
+conteúdo é determinístico: cenas de alguns segundos com gradiente, formas em
+movimento e ruído, e uma cena parada a cada quatro.
+
+Para cada clipe são medidos, cada medida em um processo novo (pico de memória
+e caches de uma execução isolada) e repetida ``--repeat`` vezes (vale a mediana):
+
+- abertura: leitura dos metadados (probe.py, sem cache) e tempo até o primeiro frame;
+- extração: frames/s e bytes/frame do FrameExtractor (ver benchmark.py);
+- preview: frames/s do DecodeAheadReader renderizando fora da tela, sem Tk;
+- seek: latência entre o seek e o primeiro frame do novo trecho;
+- pico de memória (RSS) de cada medida.
+
+Também é medido o tempo de inicialização do aplicativo em um interpretador
+novo: importar o vid.py e, onde houver display, o ``vid.py --startup-time``
+(janela na tela e subsistemas carregados).
+"""
+import argparse
+import bisect
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import cache
+from benchmark import benchmark_format
+from extractor import DEFAULT_FORMAT, DEFAULT_WORKERS, find_keyframes
+from playback import DecodeAheadReader
+from probe import probe_video
+from profiling import peak_rss
+
+# Incrementar quando a estrutura do JSON de resultados mudar
+RESULTS_VERSION = 1
+# Duração de cada cena dos clipes sintéticos (s)
+SCENE_SECONDS = 3.0
+# Tamanho da área de preview usada na medida de renderização
+PREVIEW_SIZE = (960, 540)
+DEFAULT_REPEAT = 3
+DEFAULT_SEEKS = 20
+SEEK_SEED = 1234
+# Variação (%) abaixo da qual a comparação considera o resultado igual
+DEFAULT_THRESHOLD = 5.0
+
+
+class ClipSpec:
+    """Parâmetros de um clipe sintético"""
+
+    def __init__(self, width, height, fps, seconds, codec='mp4v', extension='.mp4'):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.seconds = seconds
+        self.codec = codec
+        self.extension = extension
+
+    @property
+    def name(self):
+        return f"{self.width}x{self.height}_{self.fps:g}fps_{self.seconds:g}s_{self.codec}"
+
+    @property
+    def frame_count(self):
+        return int(round(self.fps * self.seconds))
+
+    def as_dict(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'seconds': self.seconds,
+            'codec': self.codec,
+        }
+
+
+CLIP_SPECS = [
+    ClipSpec(640, 360, 25, 10),
+    ClipSpec(640, 360, 25, 60),
+    ClipSpec(1280, 720, 30, 10),
+    ClipSpec(1280, 720, 30, 10, 'MJPG', '.avi'),
+    ClipSpec(1280, 720, 24, 10, 'XVID', '.avi'),
+    ClipSpec(1920, 1080, 60, 5),
+]
+QUICK_CLIP_SPECS = [
+    ClipSpec(640, 360, 25, 4),
+    ClipSpec(1280, 720, 30, 4, 'MJPG', '.avi'),
+]
+
+# Tempos de inicialização (ms, menor é melhor) comparados entre execuções
+STARTUP_METRICS = ('import_ms', 'window_ms', 'ready_ms')
+# (medida, valor, maior é melhor) comparados entre execuções
+COMPARED_METRICS = [
+    ('open', 'probe_ms', False),
+    ('open', 'first_frame_ms', False),
+    ('extract', 'frames_per_second', True),
+    ('extract', 'peak_rss', False),
+    ('preview', 'frames_per_second', True),
+    ('preview', 'first_frame_ms', False),
+    ('preview', 'peak_rss', False),
+    ('seek', 'median_ms', False),
+    ('seek', 'p95_ms', False),
+]
+
+
+def synthetic_frame(width, height, index, fps):
+    """Frame ``index`` de um clipe sintético (BGR), sempre igual para os mesmos parâmetros"""
+    scene = int(index / (fps * SCENE_SECONDS))
+    # Uma cena em cada quatro fica parada: frames repetidos, como em gravações de tela
+    static = scene % 4 == 3
+    t = scene * SCENE_SECONDS if static else index / fps
+    scene_rng = np.random.default_rng(scene)
+    base = scene_rng.integers(0, 256, size=3)
+    x = np.linspace(0.0, 1.0, width, dtype=np.float32)
+    y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for channel in range(3):
+        ramp = (x * (channel + 1) + y + t * 0.2) % 1.0
+        frame[:, :, channel] = ramp * 150 + base[channel] * 0.4
+    for _ in range(6):
+        cx, cy, vx, vy = scene_rng.random(4)
+        radius = int(height * (0.05 + 0.1 * scene_rng.random()))
+        center = (int((cx + vx * t * 0.3) % 1.0 * width), int((cy + vy * t * 0.3) % 1.0 * height))
+        color = tuple(int(c) for c in scene_rng.integers(0, 256, size=3))
+        cv2.circle(frame, center, radius, color, -1)
+    cv2.putText(frame, str(index), (width // 20, height // 6), cv2.FONT_HERSHEY_SIMPLEX, height / 240,
+                (255, 255, 255), max(1, height // 180))
+    if not static:
+        noise = np.random.default_rng(index).integers(0, 12, size=(height, width), dtype=np.uint8)
+        cv2.add(frame, cv2.merge([noise] * 3), dst=frame)
+    return frame
+
+
+def generate_clip(spec, directory):
+    """Grava o clipe (se ainda não existir) e retorna o caminho; None se o codec não estiver disponível"""
+    path = os.path.join(directory, spec.name + spec.extension)
+    if os.path.exists(path):
+        return path
+    temp_path = os.path.join(directory, f"{spec.name}.{os.getpid()}.tmp{spec.extension}")
+    writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*spec.codec), spec.fps, (spec.width, spec.height))
+    try:
+        if writer.isOpened():
+            for index in range(spec.frame_count):
+                writer.write(synthetic_frame(spec.width, spec.height, index, spec.fps))
+    finally:
+        writer.release()
+    # Alguns backends abrem o VideoWriter mas gravam um arquivo ilegível
+    cap = cv2.VideoCapture(temp_path)
+    readable = cap.isOpened() and cap.read()[0]
+    cap.release()
+    if not readable:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+    os.replace(temp_path, path)
+    return path
+
+
+def measure_open(video_path):
+    start = time.perf_counter()
+    probe_video(video_path, use_cache=False)
+    probed = time.perf_counter()
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.read()[0]:
+            raise IOError(f"Não foi possível ler o vídeo: {video_path}")
+    finally:
+        cap.release()
+    return {
+        'probe_ms': (probed - start) * 1000,
+        'first_frame_ms': (time.perf_counter() - probed) * 1000,
+        'peak_rss': peak_rss(),
+    }
+
+
+def measure_extract(video_path, image_format, workers, processes):
+    result = benchmark_format(video_path, image_format, workers=workers, processes=processes)
+    result['peak_rss'] = peak_rss()
+    result['peak_rss_children'] = peak_rss(children=True)
+    return result
+
+
+def _next_frame(reader, loop=None):
+    """Aguarda o próximo frame do leitor (do trecho ``loop``, se informado); None no fim do vídeo"""
+    while True:
+        if loop is not None:
+            reader.buffer.discard_before(loop)
+        item = reader.buffer.pop()
+        if item is not None:
+            if loop is None or item.loop == loop:
+                return item
+            reader.release(item)
+            continue
+        if reader.finished.is_set() and len(reader.buffer) == 0:
+            if reader.error is not None:
+                raise reader.error
+            return None
+        time.sleep(0.0005)
+
+
+def measure_preview(video_path, size=PREVIEW_SIZE):
+    """Renderiza o vídeo inteiro o mais rápido possível no tamanho ``size`` (sem Tk)"""
+    start = time.perf_counter()
+    reader = DecodeAheadReader(video_path, loop=False)
+    reader.target_size = size
+    reader.start()
+    frames = 0
+    first_frame = None
+    try:
+        while True:
+            item = _next_frame(reader)
+            if item is None:
+                break
+            if first_frame is None:
+                first_frame = time.perf_counter()
+            frames += 1
+            reader.release(item)
+    finally:
+        reader.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        'frames': frames,
+        'frames_per_second': frames / elapsed if elapsed > 0 else 0.0,
+        'first_frame_ms': (first_frame - start) * 1000 if first_frame is not None else None,
+        'peak_rss': peak_rss(),
+    }
+
+
+def measure_seek(video_path, count=DEFAULT_SEEKS, seed=SEEK_SEED, size=PREVIEW_SIZE):
+    """Latência de ``count`` seeks para frames sorteados (sempre os mesmos para a mesma semente)"""
+    info = probe_video(video_path)
+    keyframes = find_keyframes(video_path)
+    rng = random.Random(seed)
+    targets = [rng.randrange(max(1, info.frame_count)) for _ in range(count)]
+    reader = DecodeAheadReader(video_path, info=info)
+    reader.target_size = size
+    reader.start()
+    latencies = []
+    misses = 0
+    try:
+        for target in targets:
+            keyframe = None
+            if keyframes:
+                index = bisect.bisect_right(keyframes, target)
+                keyframe = keyframes[index - 1] if index > 0 else None
+            start = time.perf_counter()
+            loop = reader.seek(target, keyframe)
+            item = _next_frame(reader, loop)
+            latencies.append(time.perf_counter() - start)
+            if item is None:
+                break
+            if item.frame_number != target:
+                misses += 1
+            reader.release(item)
+    finally:
+        reader.stop()
+    latencies.sort()
+    return {
+        'seeks': len(latencies),
+        'keyframes_known': keyframes is not None,
+        'median_ms': statistics.median(latencies) * 1000 if latencies else None,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else None,
+        'max_ms': latencies[-1] * 1000 if latencies else None,
+        'wrong_frames': misses,
+        'peak_rss': peak_rss(),
+    }
+
+
+def _last_error_line(completed):
+    return completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'erro'
+
+
+def measure_startup(repeat=DEFAULT_REPEAT):
+    """Inicialização do aplicativo (vid.py) em um interpretador novo.
+
+    ``import_ms`` é o tempo do processo que só importa o módulo; ``window_ms``
+    (janela na tela) e ``ready_ms`` (OpenCV e áudio carregados em segundo plano)
+    vêm de ``vid.py --startup-time`` e exigem um display (senão ``window_error``).
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-c', 'import vid'], cwd=directory,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {'error': _last_error_line(completed)}
+        samples.append(time.perf_counter() - start)
+    result = {'import_ms': statistics.median(samples) * 1000, 'repeat': repeat}
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, 'vid.py', '--startup-time'], cwd=directory,
+                                   capture_output=True, text=True, timeout=120)
+        if completed.returncode != 0:
+            result['window_error'] = _last_error_line(completed)
+            return result
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    result.update(median_result(runs))
+    return result
+
+
+def run_isolated(function, *args):
+    """Executa ``function(*args)`` em um processo novo e retorna o resultado"""
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(function, *args).result()
+
+
+def median_result(results):
+    """Combina as repetições de uma medida: mediana de cada valor numérico"""
+    combined = dict(results[0])
+    for key, value in results[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values = [result[key] for result in results if isinstance(result.get(key), (int, float))]
+            # Contagens continuam inteiras
+            combined[key] = statistics.median_low(values) if isinstance(value, int) else statistics.median(values)
+    combined['repeat'] = len(results)
+    return combined
+
+
+def repeat_measure(repeat, function, *args):
+    try:
+        return median_result([run_isolated(function, *args) for _ in range(repeat)])
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def environment():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def run_suite(specs, videos=(), repeat=DEFAULT_REPEAT, image_format=DEFAULT_FORMAT, workers=DEFAULT_WORKERS,
+              processes=1, seeks=DEFAULT_SEEKS, clips_dir=None, log=print):
+    """Gera os clipes e executa todas as medidas; retorna o dicionário de resultados"""
+    clips_dir = clips_dir or cache.cache_dir('bench')
+    os.makedirs(clips_dir, exist_ok=True)
+    clips = []
+    for spec in specs:
+        log(f"Gerando {spec.name}...")
+        path = generate_clip(spec, clips_dir)
+        if path is None:
+            log(f"  codec {spec.codec} indisponível neste OpenCV, clipe ignorado")
+            continue
+        clips.append((spec.name, spec.as_dict(), path))
+    for video_path in videos:
+        clips.append((os.path.basename(video_path), {'path': os.path.abspath(video_path)}, video_path))
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'options': {'repeat': repeat, 'format': image_format, 'workers': workers, 'processes': processes,
+                    'seeks': seeks, 'preview_size': list(PREVIEW_SIZE)},
+        'startup': measure_startup(repeat),
+        'clips': {},
+    }
+    for name, spec, path in clips:
+        log(f"Medindo {name}...")
+        results['clips'][name] = {
+            'spec': spec,
+            'open': repeat_measure(repeat, measure_open, path),
+            'extract': repeat_measure(repeat, measure_extract, path, image_format, workers, processes),
+            'preview': repeat_measure(repeat, measure_preview, path),
+            'seek': repeat_measure(repeat, measure_seek, path, seeks),
+        }
+    return results
+
+
+def _metric_rows(results):
+    """(clipe, 'medida.valor', valor, maior é melhor) de uma execução"""
+    startup = results.get('startup', {})
+    rows = [('-', f'startup.{key}', startup.get(key), False) for key in STARTUP_METRICS]
+    for clip, measures in results.get('clips', {}).items():
+        for measure, key, higher_is_better in COMPARED_METRICS:
+            rows.append((clip, f"{measure}.{key}", measures.get(measure, {}).get(key), higher_is_better))
+    return rows
+
+
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD):
+    """Compara duas execuções; retorna (clipe, métrica, base, novo, variação %, situação)"""
+    new_values = {(clip, metric): value for clip, metric, value, _ in _metric_rows(new)}
+    rows = []
+    for clip, metric, base_value, higher_is_better in _metric_rows(base):
+        new_value = new_values.get((clip, metric))
+        if not isinstance(base_value, (int, float)) or not isinstance(new_value, (int, float)):
+            continue
+        change = (new_value - base_value) / base_value * 100 if base_value else 0.0
+        status = ''
+        if abs(change) >= threshold:
+            status = 'melhor' if (change > 0) == higher_is_better else 'pior'
+        rows.append((clip, metric, base_value, new_value, change, status))
+    return rows
+
+
+def _format_metric(value, width, scale=1):
+    """Valor com uma casa decimal alinhado à direita, ou '-' se a medida não foi obtida"""
+    return f"{'-':>{width}}" if value is None else f"{value / scale:>{width}.1f}"
+
+
+def print_results(results):
+    startup = results['startup']
+    if 'import_ms' in startup:
+        print(f"Inicialização (import vid): {startup['import_ms']:.0f} ms")
+    else:
+        print(f"Inicialização (import vid): {startup.get('error')}")
+    if 'window_ms' in startup:
+        print(f"Inicialização (vid.py): janela em {startup['window_ms']:.0f} ms, "
+              f"pronto em {startup['ready_ms']:.0f} ms")
+    elif 'window_error' in startup:
+        print(f"Inicialização (vid.py): {startup['window_error']}")
+    print(f"{'clipe':<28} {'abrir ms':>9} {'extração fps':>13} {'preview fps':>12} {'seek ms':>8} {'RSS MB':>7}")
+    for name, measures in results['clips'].items():
+        errors = [f"{measure}: {measures[measure]['error']}" for measure in ('open', 'extract', 'preview', 'seek')
+                  if 'error' in measures[measure]]
+        if errors:
+            print(f"{name:<28} {'; '.join(errors)}")
+            continue
+        rss = max(measures[measure]['peak_rss'] or 0 for measure in ('open', 'extract', 'preview', 'seek'))
+        print(f"{name:<28} {_format_metric(measures['open']['first_frame_ms'], 9)} "
+              f"{_format_metric(measures['extract']['frames_per_second'], 13)} "
+              f"{_format_metric(measures['preview']['frames_per_second'], 12)} "
+              f"{_format_metric(measures['seek']['median_ms'], 8)} {_format_metric(rss or None, 7, 1024 * 1024)}")
+
+
+def print_comparison(base, new, rows):
+    for key in ('platform', 'processor', 'opencv'):
+        if base['environment'].get(key) != new['environment'].get(key):
+            print(f"Aviso: {key} diferente entre as execuções ({base['environment'].get(key)} / "
+                  f"{new['environment'].get(key)})")
+    print(f"{'clipe':<28} {'métrica':<26} {'base':>10} {'novo':>10} {'variação':>9}")
+    for clip, metric, base_value, new_value, change, status in rows:
+        if metric.endswith('peak_rss'):
+            metric, base_value, new_value = f"{metric} MB", base_value / (1024 * 1024), new_value / (1024 * 1024)
+        print(f"{clip:<28} {metric:<26} {base_value:>10.1f} {new_value:>10.1f} {change:>+8.1f}% {status}")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks reprodutíveis de extração, preview, seek e abertura.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Gera os clipes sintéticos e executa as medidas")
+    run.add_argument('--json', dest='json_path', default=None, help="Grava os resultados neste arquivo JSON")
+    run.add_argument('--quick', action='store_true', help="Apenas clipes curtos (QUICK_CLIP_SPECS)")
+    run.add_argument('--clip', dest='clips', action='append', default=None,
+                     help="Mede apenas o clipe com este nome (pode repetir)")
+    run.add_argument('--video', dest='videos', action='append', default=[],
+                     help="Inclui também um vídeo real nas medidas (pode repetir)")
+    run.add_argument('--no-synthetic', action='store_true', help="Não gera nem mede os clipes sintéticos")
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Repetições de cada medida (vale a mediana)")
+    run.add_argument('-f', '--format', dest='image_format', default=DEFAULT_FORMAT,
+                     help="Formato de saída da medida de extração")
+    run.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="Threads de gravação")
+    run.add_argument('-p', '--processes', type=int, default=1, help="Processos de decodificação")
+    run.add_argument('--seeks', type=int, default=DEFAULT_SEEKS, help="Seeks por clipe")
+    run.add_argument('--clips-dir', default=None, help="Pasta dos clipes sintéticos (padrão: cache do usuário)")
+
+    compare = commands.add_parser('compare', help="Compara dois arquivos de resultados")
+    compare.add_argument('base', help="Resultados de referência")
+    compare.add_argument('new', help="Resultados novos")
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="Variação (%%) a partir da qual uma métrica é marcada como melhor/pior")
+    compare.add_argument('--fail-on-regression', action='store_true',
+                         help="Retorna código 1 se alguma métrica piorar além do limite")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command == 'compare':
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        rows = compare_results(base, new, args.threshold)
+        print_comparison(base, new, rows)
+        return 1 if args.fail_on_regression and any(row[5] == 'pior' for row in rows) else 0
+
+    specs = [] if args.no_synthetic else (QUICK_CLIP_SPECS if args.quick else CLIP_SPECS)
+    if args.clips:
+        specs = [spec for spec in specs if spec.name in args.clips]
+    results = run_suite(specs, args.videos, max(1, args.repeat), args.image_format, args.workers, args.processes,
+                        args.seeks, args.clips_dir)
+    # Os resultados são gravados antes de qualquer impressão, para não se perderem
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    print_results(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
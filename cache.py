@@ -0,0 +1,60 @@
+"""Cache em disco de dados derivados dos vídeos (áudio decodificado, metadados...).
+
+Cada entrada é identificada pelo caminho absoluto do vídeo, sua data de
+modificação e seu tamanho, de modo que um arquivo alterado nunca reaproveita
+dados antigos. A pasta base pode ser trocada pela variável VID_CACHE_DIR.
+"""
+import hashlib
+import os
+import sys
+
+
+def cache_root():
+    """Pasta base do cache"""
+    root = os.environ.get('VID_CACHE_DIR')
+    if root:
+        return root
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'vid', 'cache')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'vid')
+
+
+def cache_dir(kind):
+    """Subpasta do cache para um tipo de dado (criada se necessário)"""
+    path = os.path.join(cache_root(), kind)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_key(video_path, *extra):
+    """Chave estável para o arquivo no seu estado atual (caminho + mtime + tamanho)"""
+    video_path = os.path.abspath(video_path)
+    info = os.stat(video_path)
+    parts = [video_path, str(info.st_mtime_ns), str(info.st_size)] + [str(value) for value in extra]
+    return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def cache_path(kind, video_path, suffix, *extra):
+    """Caminho da entrada de cache de ``video_path`` para o tipo ``kind``"""
+    return os.path.join(cache_dir(kind), file_key(video_path, *extra) + suffix)
+
+
+def prune(kind, max_bytes, keep=()):
+    """Remove as entradas mais antigas até o tipo ``kind`` ocupar no máximo ``max_bytes``"""
+    directory = cache_dir(kind)
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.path not in keep:
+            info = entry.stat()
+            entries.append((info.st_mtime, info.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass  # Em uso por outro processo
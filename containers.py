@@ -0,0 +1,228 @@
+"""Saída de frames em um único arquivo, em vez de um arquivo por frame.
+
+Dois tipos de container são suportados:
+
+- ``array``: um ``.npy`` com shape (frames, altura, largura, 3) gravado via
+  memória mapeada. Leitores podem usar ``np.load(caminho, mmap_mode='r')`` e
+  fatiar frames sem cópia.
+- ``archive``: um ``.npz`` com blocos de frames comprimidos (membros
+  ``chunk_000000``, ``chunk_000001``...), lido com ``np.load``.
+
+Nos dois casos ``<nome>_index.json`` lista, para cada frame gravado, o número
+do frame no vídeo, o timestamp em segundos e a posição dentro do container.
+"""
+import io
+import json
+import os
+import threading
+import zipfile
+
+import numpy as np
+
+CONTAINER_TYPES = ('array', 'archive')
+CONTAINER_EXTENSIONS = {'array': '.npy', 'archive': '.npz'}
+# Tamanho aproximado de cada bloco comprimido do container 'archive'
+ARCHIVE_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def container_paths(output_dir, video_name, container):
+    """Retorna (caminho do container, caminho do índice)"""
+    if container not in CONTAINER_TYPES:
+        raise ValueError(f"Tipo de container desconhecido: {container}")
+    return (os.path.join(output_dir, video_name + CONTAINER_EXTENSIONS[container]),
+            os.path.join(output_dir, f"{video_name}_index.json"))
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    return version, shape, fortran_order, dtype, f.tell()
+
+
+def _npy_header_bytes(version, header):
+    buffer = io.BytesIO()
+    if version == (1, 0):
+        np.lib.format.write_array_header_1_0(buffer, header)
+    else:
+        np.lib.format.write_array_header_2_0(buffer, header)
+    return buffer.getvalue()
+
+
+class FrameArraySink:
+    """Grava frames em posições fixas de um .npy mapeado em memória.
+
+    O arquivo é criado uma vez (``create``) com espaço para todos os frames
+    previstos; vários processos podem abri-lo ao mesmo tempo, cada um gravando
+    as suas posições.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.array = np.load(path, mmap_mode='r+')
+
+    @classmethod
+    def create(cls, path, capacity, frame_shape, dtype=np.uint8):
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype,
+                                          shape=(max(0, capacity),) + tuple(frame_shape))
+        del array
+        return cls(path)
+
+    def write(self, frame, slot):
+        if frame.shape != self.array.shape[1:]:
+            raise ValueError(f"Frame com dimensões inesperadas: {frame.shape} (esperado {self.array.shape[1:]})")
+        self.array[slot] = frame
+
+    def close(self):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+
+    def finalize(self, count):
+        """Reduz o arquivo para ``count`` frames e retorna a função que localiza cada posição"""
+        with open(self.path, 'r+b') as f:
+            version, shape, _, dtype, data_offset = _read_npy_header(f)
+            frame_bytes = int(np.prod(shape[1:])) * dtype.itemsize
+            if count < shape[0]:
+                header = _npy_header_bytes(version, {
+                    'descr': np.lib.format.dtype_to_descr(dtype),
+                    'fortran_order': False,
+                    'shape': (count,) + tuple(shape[1:]),
+                })
+                # O cabeçalho é alinhado e quase sempre mantém o tamanho; se mudar,
+                # o arquivo fica com a capacidade original e o índice indica os frames válidos
+                if len(header) == data_offset:
+                    f.seek(0)
+                    f.write(header)
+                    f.truncate(data_offset + count * frame_bytes)
+        return lambda slot: {'offset': data_offset + slot * frame_bytes}
+
+    def index_fields(self):
+        return {}
+
+
+class FrameArchiveSink:
+    """Agrupa frames em blocos comprimidos dentro de um .npz.
+
+    Os frames podem chegar fora de ordem (várias threads de gravação); cada
+    bloco é montado em memória e gravado no arquivo assim que fica completo.
+    """
+
+    def __init__(self, path, capacity, frame_shape, dtype=np.uint8, compresslevel=1):
+        self.path = path
+        self.capacity = capacity
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.chunk_frames = max(1, ARCHIVE_CHUNK_BYTES // max(1, frame_bytes))
+        self.archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+        self._chunks = {}
+        self._lock = threading.Lock()
+        self._archive_lock = threading.Lock()
+
+    @staticmethod
+    def chunk_name(chunk):
+        return f"chunk_{chunk:06d}"
+
+    def write(self, frame, slot):
+        chunk, position = divmod(slot, self.chunk_frames)
+        with self._lock:
+            entry = self._chunks.get(chunk)
+            if entry is None:
+                length = min(self.chunk_frames, self.capacity - chunk * self.chunk_frames)
+                # [frames do bloco, frames recebidos, maior posição usada]
+                entry = self._chunks[chunk] = [np.zeros((length,) + self.frame_shape, self.dtype), 0, 0]
+        # Cada thread grava em uma posição diferente do bloco
+        entry[0][position] = frame
+        with self._lock:
+            entry[1] += 1
+            entry[2] = max(entry[2], position + 1)
+            complete = entry[1] == len(entry[0])
+            if complete:
+                del self._chunks[chunk]
+        if complete:
+            self._store(chunk, entry[0])
+
+    def _store(self, chunk, frames):
+        with self._archive_lock:
+            with self.archive.open(self.chunk_name(chunk) + '.npy', 'w', force_zip64=True) as member:
+                np.lib.format.write_array(member, frames, allow_pickle=False)
+
+    def close(self):
+        # Blocos incompletos (fim do vídeo antes do previsto ou cancelamento)
+        for chunk, (frames, _, used) in sorted(self._chunks.items()):
+            self._store(chunk, frames[:used])
+        self._chunks.clear()
+        self.archive.close()
+
+    def finalize(self, count):
+        """Retorna a função que localiza cada posição (bloco e posição dentro dele)"""
+        chunk_frames = self.chunk_frames
+        return lambda slot: {'chunk': self.chunk_name(slot // chunk_frames), 'position': slot % chunk_frames}
+
+    def index_fields(self):
+        return {'chunk_frames': self.chunk_frames}
+
+
+def write_index(index_path, container, container_path, video_path, fps, frame_shape, entries, locate,
+                **extra):
+    """Grava o índice JSON do container; ``entries`` são tuplas (frame, timestamp, posição)"""
+    frames = []
+    for frame_number, timestamp, slot in sorted(entries, key=lambda entry: entry[2]):
+        frames.append(dict({'frame': frame_number, 'timestamp': timestamp, 'slot': slot}, **locate(slot)))
+    index = dict({
+        'video': video_path,
+        'container': container,
+        'file': os.path.basename(container_path),
+        'dtype': 'uint8',
+        'frame_shape': list(frame_shape),
+        'fps': fps,
+        'count': max((entry[2] for entry in entries), default=-1) + 1,
+        'frames': frames,
+    }, **extra)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+
+class FrameArchive:
+    """Acesso aleatório, frame a frame, a um container 'archive'"""
+
+    def __init__(self, path, chunk_frames, count):
+        self.npz = np.load(path)
+        self.chunk_frames = chunk_frames
+        self.count = count
+        self._cached_chunk = None
+        self._cached_frames = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, slot):
+        if not 0 <= slot < self.count:
+            raise IndexError(slot)
+        chunk, position = divmod(slot, self.chunk_frames)
+        if chunk != self._cached_chunk:
+            self._cached_frames = self.npz[FrameArchiveSink.chunk_name(chunk)]
+            self._cached_chunk = chunk
+        return self._cached_frames[position]
+
+    def close(self):
+        self.npz.close()
+
+
+def open_frame_container(index_path):
+    """Abre um container a partir do seu índice e retorna (frames, índice).
+
+    Para o container 'array' ``frames`` é um memmap somente leitura (fatias sem cópia);
+    para 'archive' é um FrameArchive.
+    """
+    with open(index_path, encoding='utf-8') as f:
+        index = json.load(f)
+    path = os.path.join(os.path.dirname(index_path), index['file'])
+    if index['container'] == 'array':
+        frames = np.load(path, mmap_mode='r')[:index['count']]
+    else:
+        frames = FrameArchive(path, index['chunk_frames'], index['count'])
+    return frames, index
@@ -0,0 +1,110 @@
+"""Amostragem por conteúdo: descarte de frames repetidos e extração só nas trocas de cena.
+
+    python extractor.py aula.mp4 -o /saida --skip-duplicates
+    python extractor.py camera.mp4 -o /saida --scene-changes --threshold 0.2
+
+Cada frame decodificado recebe uma assinatura barata: uma miniatura de
+SIGNATURE_SIZE x SIGNATURE_SIZE pixels e o histograma de cores dela.
+
+- ``dedup``: o frame é gravado se a miniatura (em tons de cinza) diferir da do
+  último frame gravado em pelo menos ``threshold`` (diferença absoluta média,
+  0 a 1); mudanças lentas acumulam até gerar um novo frame.
+- ``scenes``: o frame é gravado se o histograma de cores diferir do do frame
+  anterior (gravado ou não) em pelo menos ``threshold`` (fração dos pixels que
+  mudou de faixa de cor, 0 a 1), ou seja, apenas nos cortes. O histograma quase
+  não muda com movimento dentro da cena, mas muda bastante em um corte.
+
+O primeiro frame é sempre gravado. O manifesto (``<vídeo>_manifest.json``)
+relaciona cada frame gravado ao número e ao instante do frame original.
+"""
+import json
+import os
+
+import cv2
+import numpy as np
+
+SAMPLING_MODES = ('dedup', 'scenes')
+SIGNATURE_SIZE = 32
+# Faixas por canal do histograma de cores (4 x 4 x 4 = 64 classes)
+HISTOGRAM_BINS = 4
+# Limiares padrão (0-1), ver acima
+DEFAULT_THRESHOLDS = {
+    'dedup': 0.02,
+    'scenes': 0.2,
+}
+MANIFEST_SUFFIX = '_manifest.json'
+
+
+def frame_signature(frame):
+    """Retorna (miniatura em tons de cinza float32 0-1, histograma de cores normalizado) do frame BGR"""
+    height, width = frame.shape[:2]
+    # Frames grandes são amostrados com passo antes da média, o que reduz o custo sem mudar a assinatura
+    step = min(height, width) // (SIGNATURE_SIZE * 8)
+    if step > 1:
+        frame = np.ascontiguousarray(frame[::step, ::step])
+    small = cv2.resize(frame, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    if small.ndim == 2:
+        small = cv2.cvtColor(small, cv2.COLOR_GRAY2BGR)
+    histogram = cv2.calcHist([small], [0, 1, 2], None, [HISTOGRAM_BINS] * 3, [0, 256] * 3)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return gray.astype(np.float32) / 255, histogram.ravel() / (SIGNATURE_SIZE * SIGNATURE_SIZE)
+
+
+def thumbnail_difference(first, second):
+    """Diferença absoluta média entre as miniaturas de duas assinaturas (0 a 1)"""
+    return float(cv2.norm(first[0], second[0], cv2.NORM_L1)) / first[0].size
+
+
+def histogram_difference(first, second):
+    """Fração dos pixels que mudou de faixa de cor entre duas assinaturas (0 a 1)"""
+    return float(cv2.norm(first[1], second[1], cv2.NORM_L1)) / 2
+
+
+class FrameSampler:
+    """Decide, frame a frame e na ordem de decodificação, quais frames gravar"""
+
+    def __init__(self, mode='dedup', threshold=None):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Modo de amostragem desconhecido: {mode}")
+        self.mode = mode
+        self.threshold = DEFAULT_THRESHOLDS[mode] if threshold is None else float(threshold)
+        if not 0 <= self.threshold <= 1:
+            raise ValueError("O limiar deve estar entre 0 e 1")
+        self._difference = thumbnail_difference if mode == 'dedup' else histogram_difference
+        self._reference = None
+
+    def accept(self, frame):
+        """Retorna (gravar o frame?, diferença para a referência ou None no primeiro frame)"""
+        signature = frame_signature(frame)
+        difference = None if self._reference is None else self._difference(signature, self._reference)
+        keep = difference is None or difference >= self.threshold
+        if keep or self.mode == 'scenes':
+            self._reference = signature
+        return keep, difference
+
+
+def manifest_path(output_dir, video_name):
+    return os.path.join(output_dir, video_name + MANIFEST_SUFFIX)
+
+
+def write_manifest(path, video_path, sampler, fps, decoded, entries, cancelled=False):
+    """Grava o manifesto; ``entries`` são tuplas (frame, timestamp, diferença, arquivo ou posição)"""
+    frames = []
+    for frame_number, timestamp, difference, location in entries:
+        entry = {'frame': frame_number, 'timestamp': timestamp, 'difference': difference}
+        entry['slot' if isinstance(location, int) else 'file'] = location
+        frames.append(entry)
+    manifest = {
+        'video': video_path,
+        'mode': sampler.mode,
+        'threshold': sampler.threshold,
+        'fps': fps,
+        'decoded_frames': decoded,
+        'kept_frames': len(frames),
+        'cancelled': cancelled,
+        'frames': frames,
+    }
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, path)
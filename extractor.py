@@ -0,0 +1,904 @@
+"""Motor de extração de frames sem interface gráfica.
+
+Pode ser usado pelo aplicativo Tk (vid.py) ou diretamente pela linha de comando:
+
+    python extractor.py video.mp4 outro.mov -o /saida --format tiff --start 0 --end 500 --workers 8
+
+O formato de saída é escolhido com ``--format`` (ver OUTPUT_FORMATS) e, para
+PNG/JPEG/WebP, ajustado com ``--quality``.
+
+A seleção de frames aceita intervalo por frame (``--start/--end``) ou por tempo
+(``--start-time/--end-time``), um frame a cada N (``--step``), N frames por
+segundo (``--sample-fps``) ou apenas keyframes (``--keyframes``). Frames
+ignorados são pulados com seek ou ``VideoCapture.grab()``, sem conversão nem gravação.
+
+Com ``--container array|archive`` todos os frames vão para um único arquivo
+(ver containers.py) acompanhado de um índice JSON, em vez de um arquivo por frame.
+
+Com ``--processes N`` o vídeo é dividido em trechos alinhados a keyframes,
+decodificados em paralelo por N processos, cada um com seu próprio VideoCapture.
+
+Com ``--resume`` uma extração interrompida continua de onde parou: os frames
+que já existem na pasta de saída são pulados. Cada frame é gravado em um
+arquivo temporário e renomeado ao final, então um frame presente em disco está
+sempre completo. A pasta guarda a identidade do vídeo de origem (SOURCE_MARKER):
+frames de outro vídeo ou de outra versão do mesmo arquivo nunca são aproveitados,
+e vídeos de mesmo nome em uma só execução (take1.mp4 e take1.avi) vão para
+pastas diferentes (ver output_name).
+
+Com ``--size``, ``--crop`` e ``--color`` os frames são recortados,
+redimensionados e/ou convertidos antes da gravação (ver transforms.py).
+
+Com ``--skip-duplicates`` frames quase iguais ao último gravado são
+descartados, e com ``--scene-changes`` só os frames de troca de cena são
+gravados; um manifesto relaciona os frames gravados aos originais (ver dedup.py).
+
+Com ``--profile [TRACE]`` (ou VID_PROFILE=1) os tempos de leitura e gravação,
+a fila de gravação e o pico de memória são medidos (ver profiling.py).
+"""
+import argparse
+import bisect
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from cache import file_key
+from dedup import DEFAULT_THRESHOLDS, FrameSampler, manifest_path, write_manifest
+from profiling import DEFAULT_TRACE_PATH, profiler
+from transforms import COLOR_CONVERSIONS, RESIZE_MODES, parse_crop, parse_size, transform_from_options
+from containers import (CONTAINER_TYPES, FrameArchiveSink, FrameArraySink, container_paths,
+                        write_index)
+
+# Formatos de saída: extensão, parâmetros fixos do cv2.imwrite e o parâmetro
+# ajustável por --quality (flag do cv2, faixa válida, valor padrão), se houver.
+# O formato 'npy' grava o array BGR sem compressão com np.save.
+OUTPUT_FORMATS = {
+    'tiff': ('.tiff', [cv2.IMWRITE_TIFF_COMPRESSION, cv2.IMWRITE_TIFF_COMPRESSION_DEFLATE], None),
+    'tiff-lzw': ('.tiff', [cv2.IMWRITE_TIFF_COMPRESSION, cv2.IMWRITE_TIFF_COMPRESSION_LZW], None),
+    'tiff-raw': ('.tiff', [cv2.IMWRITE_TIFF_COMPRESSION, cv2.IMWRITE_TIFF_COMPRESSION_NONE], None),
+    'png': ('.png', [], (cv2.IMWRITE_PNG_COMPRESSION, (0, 9), 3)),
+    'jpg': ('.jpg', [], (cv2.IMWRITE_JPEG_QUALITY, (0, 100), 95)),
+    'webp': ('.webp', [], (cv2.IMWRITE_WEBP_QUALITY, (1, 100), 90)),
+    'npy': ('.npy', [], None),
+}
+DEFAULT_FORMAT = 'tiff'
+DEFAULT_WORKERS = 8
+# Frames decodificados aguardando gravação, por thread de gravação
+PENDING_FRAMES_PER_WORKER = 2
+# Trechos por processo no modo paralelo, para equilibrar a carga entre eles
+SEGMENTS_PER_PROCESS = 2
+# Sem índice de keyframes, distância a partir da qual um seek compensa mais que grab() sequencial
+SEEK_THRESHOLD_FRAMES = 120
+# Prefixo dos arquivos de frames ainda em gravação
+PARTIAL_PREFIX = '.partial_'
+# Arquivo, na pasta de saída, que identifica o vídeo de origem dos frames
+SOURCE_MARKER = '.vid_source.json'
+
+
+def sanitize_video_name(video_path):
+    """Gera o nome usado na pasta e nos arquivos de saída a partir do nome do vídeo"""
+    video_name = os.path.splitext(os.path.basename(video_path))[0].replace(' ', '_')
+    for char in ("'", ":", ";", "-", "–", "—", "."):
+        video_name = video_name.replace(char, "")
+    return video_name
+
+
+def source_marker(video_path):
+    """Identidade do vídeo gravada em SOURCE_MARKER: caminho absoluto e cache.file_key"""
+    return {'video': os.path.abspath(video_path), 'key': file_key(video_path)}
+
+
+def read_source_marker(directory):
+    """Identidade gravada na pasta de saída, ou None se não houver (ou estiver ilegível)"""
+    try:
+        with open(os.path.join(directory, SOURCE_MARKER), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_source_marker(directory, video_path):
+    path = os.path.join(directory, SOURCE_MARKER)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(source_marker(video_path), f)
+    os.replace(temp_path, path)
+
+
+def output_name(output_dir, video_path, taken=()):
+    """Nome da subpasta de ``output_dir`` onde os frames do vídeo são gravados.
+
+    Normalmente o próprio nome do vídeo (sanitize_video_name). Se essa pasta já
+    pertence a outro arquivo (está em ``taken``, caminhos absolutos das pastas em
+    uso, ou seu SOURCE_MARKER aponta para outro vídeo), acrescenta a extensão
+    (take1_avi) e, se ainda preciso, um contador (take1_avi_2).
+    """
+    base = sanitize_video_name(video_path)
+    extension = os.path.splitext(video_path)[1].lstrip('.').lower()
+    with_extension = f"{base}_{extension}" if extension else base
+    candidates = itertools.chain([base, with_extension], (f"{with_extension}_{n}" for n in itertools.count(2)))
+    video = os.path.abspath(video_path)
+    for name in candidates:
+        directory = os.path.abspath(os.path.join(output_dir, name))
+        if directory in taken:
+            continue
+        marker = read_source_marker(directory)
+        if marker is None or marker.get('video') == video:
+            return name
+
+
+def encoder_settings(image_format, quality=None):
+    """Retorna (extensão, parâmetros do cv2.imwrite) para o formato e qualidade informados"""
+    if image_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Formato de saída desconhecido: {image_format}")
+    extension, params, tunable = OUTPUT_FORMATS[image_format]
+    params = list(params)
+    if tunable is not None:
+        flag, (low, high), default = tunable
+        value = default if quality is None else int(quality)
+        if not low <= value <= high:
+            raise ValueError(f"Qualidade inválida para {image_format}: {value} (esperado {low}-{high})")
+        params += [flag, value]
+    elif quality is not None:
+        raise ValueError(f"O formato {image_format} não aceita ajuste de qualidade")
+    return extension, params
+
+
+def save_frame(frame, frame_path, params=None):
+    """Salva um frame individual no formato indicado pela extensão do arquivo.
+
+    O frame é gravado com o prefixo PARTIAL_PREFIX e renomeado quando completo.
+    Retorna o tamanho do arquivo em bytes.
+    """
+    directory, name = os.path.split(frame_path)
+    partial_path = os.path.join(directory, PARTIAL_PREFIX + name)
+    with profiler.stage('imwrite'):
+        if frame_path.endswith('.npy'):
+            np.save(partial_path, frame)
+            written = True
+        else:
+            written = cv2.imwrite(partial_path, frame, params or [])
+    if not written:
+        raise IOError(f"Não foi possível gravar o frame: {frame_path}")
+    size = os.path.getsize(partial_path)
+    os.replace(partial_path, frame_path)
+    return size
+
+
+def find_keyframes(video_path):
+    """Lista os índices (em ordem de apresentação) dos keyframes do vídeo.
+
+    Usa o ffprobe, se estiver no PATH, lendo apenas os pacotes do container
+    (sem decodificar). Retorna None quando a informação não está disponível.
+    """
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None:
+        return None
+    command = [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+               '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    packets = []
+    for line in result.stdout.splitlines():
+        fields = line.split(',')
+        try:
+            packets.append((float(fields[0]), 'K' in fields[-1]))
+        except ValueError:
+            continue  # Pacotes sem pts (N/A)
+    # Os pacotes vêm em ordem de decodificação; a posição por pts é o índice do frame
+    packets.sort()
+    return [index for index, (_, is_key) in enumerate(packets) if is_key] or None
+
+
+def plan_segments(start_frame, end_frame, count, keyframes=None):
+    """Divide [start_frame, end_frame) em até ``count`` trechos.
+
+    Quando ``keyframes`` é informado, cada fronteira é movida para o keyframe
+    mais próximo, de modo que nenhum processo decodifique frames de outro trecho.
+    """
+    length = end_frame - start_frame
+    if length <= 0:
+        return []
+    count = max(1, min(count, length))
+    bounds = [start_frame]
+    for i in range(1, count):
+        target = start_frame + length * i // count
+        if keyframes:
+            index = bisect.bisect_left(keyframes, target)
+            candidates = keyframes[max(0, index - 1):index + 1]
+            target = min(candidates, key=lambda keyframe: abs(keyframe - target))
+        if bounds[-1] < target < end_frame:
+            bounds.append(target)
+    bounds.append(end_frame)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class FrameWriterPool:
+    """Threads de gravação persistentes alimentadas por uma fila limitada.
+
+    A fila limitada aplica contrapressão no decodificador: no máximo
+    ``max_pending`` frames decodificados ficam em memória aguardando gravação,
+    enquanto decodificação e codificação acontecem ao mesmo tempo. ``write_fn``
+    retorna a quantidade de bytes gravados, somada em ``bytes_written``.
+
+    Com um ``transform`` (transforms.FrameTransform), cada thread junta os
+    frames já enfileirados, até ``transform.batch_size``, e os transforma em
+    lote antes de gravá-los. Frames retirados em lote liberam lugar na fila, então
+    o lote é limitado a ``max_pending // workers`` para que os lotes em
+    andamento também caibam no limite de memória.
+    """
+
+    def __init__(self, write_fn, workers=DEFAULT_WORKERS, max_pending=None, transform=None):
+        self.write_fn = write_fn
+        self.transform = transform
+        self.queue = queue.Queue(maxsize=max_pending or workers * PENDING_FRAMES_PER_WORKER)
+        self.batch_size = 1
+        if transform is not None:
+            self.batch_size = min(transform.batch_size, max(1, self.queue.maxsize // max(1, workers)))
+        self.error = None
+        self.written = 0
+        self.bytes_written = 0
+        self._discard = False
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        if self.transform is not None and batch[0] is not None:
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item is None:
+                    break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for item in batch if item is not None]
+            try:
+                if items and not self._discard and self.error is None:
+                    if self.transform is not None:
+                        with profiler.stage('transform'):
+                            frames = self.transform.apply_batch([item[0] for item in items])
+                        items = [(frame,) + item[1:] for frame, item in zip(frames, items)]
+                    for item in items:
+                        size = self.write_fn(*item)
+                        with self._lock:
+                            self.written += 1
+                            self.bytes_written += size or 0
+            except Exception as e:
+                with self._lock:
+                    if self.error is None:
+                        self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if len(items) < len(batch):
+                return
+
+    def submit(self, *item, stop_event=None):
+        """Enfileira um frame; bloqueia enquanto a fila estiver cheia.
+
+        Retorna False se ``stop_event`` for sinalizado antes de haver espaço.
+        """
+        while True:
+            if self.error is not None:
+                raise self.error
+            if stop_event is not None and stop_event.is_set():
+                return False
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+    def close(self, discard=False):
+        """Aguarda a gravação dos frames pendentes e encerra as threads"""
+        self._discard = discard
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class ExtractionStats:
+    """Resultado de uma extração: contagem de frames e vazão medida"""
+
+    def __init__(self, video_path, output_dir):
+        self.video_path = video_path
+        self.output_dir = output_dir
+        self.frames_written = 0
+        self.total_frames = 0
+        self.bytes_written = 0
+        # Frames pulados por já existirem em disco (retomada)
+        self.frames_skipped = 0
+        # Frames descartados pela amostragem por conteúdo (repetidos ou fora das trocas de cena)
+        self.frames_deduplicated = 0
+        # Entradas (frame, timestamp, posição) dos frames gravados em container
+        self.index = []
+        # Entradas (frame, timestamp, diferença, arquivo ou posição) do manifesto da amostragem
+        self.manifest = []
+        self.elapsed = 0.0
+        self.cancelled = False
+
+    @property
+    def frames_per_second(self):
+        return self.frames_written / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'video_path': self.video_path,
+            'output_dir': self.output_dir,
+            'frames_written': self.frames_written,
+            'total_frames': self.total_frames,
+            'frames_skipped': self.frames_skipped,
+            'frames_deduplicated': self.frames_deduplicated,
+            'bytes_written': self.bytes_written,
+            'elapsed': self.elapsed,
+            'frames_per_second': self.frames_per_second,
+            'cancelled': self.cancelled,
+        }
+
+
+class FrameExtractor:
+    """Decodifica um vídeo e grava seus frames em disco, sem depender de Tk"""
+
+    def __init__(self, video_path, output_dir, image_format=DEFAULT_FORMAT, quality=None,
+                 start_frame=0, end_frame=None, start_time=None, end_time=None,
+                 step=1, sample_fps=None, keyframes_only=False, frames=None, keyframes=None,
+                 container=None, first_slot=None, workers=DEFAULT_WORKERS, max_pending=None,
+                 processes=1, resume=False, skip_frames=None, transform=None, sampling=None,
+                 sampling_threshold=None, video_name=None, progress_callback=None, stop_event=None):
+        self.video_path = video_path
+        self.image_format = image_format
+        self.quality = quality
+        self.extension, self.encode_params = encoder_settings(image_format, quality)
+        self.start_frame = max(0, int(start_frame or 0))
+        self.end_frame = end_frame
+        # Intervalo em segundos; quando informado tem precedência sobre start_frame/end_frame
+        self.start_time = start_time
+        self.end_time = end_time
+        if step < 1:
+            raise ValueError("O passo (step) deve ser maior ou igual a 1")
+        if sample_fps is not None and sample_fps <= 0:
+            raise ValueError("A taxa de amostragem (sample_fps) deve ser positiva")
+        self.step = int(step)
+        self.sample_fps = sample_fps
+        self.keyframes_only = keyframes_only
+        # Lista explícita de frames a extrair (ignora as demais opções de seleção)
+        self.frames = sorted(set(frames)) if frames is not None else None
+        # Índices de keyframes já conhecidos, para não reler o container
+        self.keyframes = keyframes
+        self.workers = max(1, int(workers))
+        self.max_pending = max_pending
+        # Processos de decodificação (0 = um por núcleo); com 1 tudo roda neste processo
+        self.processes = (os.cpu_count() or 1) if processes == 0 else max(1, int(processes))
+        if container is not None and container not in CONTAINER_TYPES:
+            raise ValueError(f"Tipo de container desconhecido: {container}")
+        if container == 'archive' and self.processes > 1:
+            raise ValueError("O container 'archive' não suporta decodificação em vários processos")
+        self.container = container
+        if resume and container is not None:
+            raise ValueError("A retomada (resume) só é suportada na saída com um arquivo por frame")
+        # Pula os frames que já existem na pasta de saída
+        self.resume = resume
+        # Frames já gravados, decodificados com grab() e não regravados na leitura contínua
+        # (definido pela retomada ou recebido pelos processos do modo paralelo)
+        self.skip_frames = set(skip_frames) if skip_frames is not None else None
+        # transforms.FrameTransform aplicado pelas threads de gravação (ou None)
+        self.transform = transform
+        # Amostragem por conteúdo ('dedup' ou 'scenes', ver dedup.py): depende da ordem de
+        # decodificação, então roda em um único processo e não combina com a retomada
+        if sampling is not None:
+            FrameSampler(sampling, sampling_threshold)  # Valida modo e limiar
+            if self.processes > 1:
+                raise ValueError("A amostragem por conteúdo não suporta decodificação em vários processos")
+            if resume:
+                raise ValueError("A amostragem por conteúdo não suporta a retomada (resume)")
+        self.sampling = sampling
+        self.sampling_threshold = sampling_threshold
+        self.sampler = None
+        # Nos processos do modo paralelo: posição do primeiro frame no container já criado
+        self.first_slot = first_slot
+        self.sink = None
+        self._name_width = 4
+        # progress_callback(frames_processados, total_de_frames, bytes_gravados) é chamado na thread
+        # de extração a cada frame; deve ser barato (ver progress.ProgressChannel)
+        self.progress_callback = progress_callback
+        self.stop_event = stop_event or threading.Event()
+        # Nome da subpasta e dos arquivos; por padrão o do vídeo (ver output_name)
+        self.video_name = video_name or sanitize_video_name(video_path)
+        self.output_dir = os.path.join(output_dir, self.video_name)
+        if container is not None:
+            self.container_path, self.index_path = container_paths(self.output_dir, self.video_name, container)
+
+    def stop(self):
+        """Solicita a interrupção da extração em andamento"""
+        self.stop_event.set()
+
+    def _frame_path(self, frame_number):
+        return os.path.join(self.output_dir,
+                            f"{self.video_name}_{frame_number:0{self._name_width}d}{self.extension}")
+
+    def _scan_output(self):
+        """(frames gravados: número -> caminho, gravações incompletas) deste vídeo na pasta de saída"""
+        prefix = f"{self.video_name}_"
+        frames = {}
+        partials = []
+        for entry in os.scandir(self.output_dir):
+            name = entry.name
+            partial = name.startswith(PARTIAL_PREFIX)
+            if partial:
+                name = name[len(PARTIAL_PREFIX):]
+            if not (name.startswith(prefix) and name.endswith(self.extension)):
+                continue
+            number = name[len(prefix):len(name) - len(self.extension)]
+            if number.isdigit() and entry.is_file():
+                if partial:
+                    partials.append(entry.path)
+                else:
+                    frames[int(number)] = entry.path
+        return frames, partials
+
+    def _existing_frames(self):
+        """Números dos frames já gravados por uma extração anterior deste mesmo arquivo.
+
+        Remove as gravações incompletas que ela deixou. Se a pasta identifica outro
+        vídeo ou outra versão do arquivo (ver SOURCE_MARKER), ou nenhum, os frames
+        dela também são removidos e a extração recomeça do zero.
+        """
+        frames, partials = self._scan_output()
+        same_source = read_source_marker(self.output_dir) == source_marker(self.video_path)
+        for path in partials + ([] if same_source else list(frames.values())):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return set(frames) if same_source else set()
+
+    def _write(self, frame, frame_number, slot, timestamp, stats):
+        if self.sink is not None:
+            with profiler.stage('sink_write'):
+                self.sink.write(frame, slot)
+            stats.index.append((frame_number, timestamp, slot))
+            return frame.nbytes
+        return save_frame(frame, self._frame_path(frame_number), self.encode_params)
+
+    @property
+    def is_sparse(self):
+        """Indica se apenas parte dos frames do intervalo será extraída"""
+        return (self.frames is not None or self.step > 1
+                or self.sample_fps is not None or self.keyframes_only)
+
+    def _get_keyframes(self):
+        if self.keyframes is None:
+            self.keyframes = find_keyframes(self.video_path) or []
+        return self.keyframes
+
+    def _select_frames(self, start_frame, end_frame, fps):
+        """Lista os números dos frames de [start_frame, end_frame) que serão extraídos"""
+        if self.frames is not None:
+            return [n for n in self.frames if start_frame <= n < end_frame]
+        if self.keyframes_only:
+            keyframes = self._get_keyframes()
+            if not keyframes:
+                raise RuntimeError("A extração de keyframes requer o ffprobe para indexar o vídeo")
+            start = bisect.bisect_left(keyframes, start_frame)
+            selected = keyframes[start:bisect.bisect_left(keyframes, end_frame)]
+        elif self.sample_fps is not None:
+            if fps <= 0:
+                raise RuntimeError("FPS do vídeo desconhecido; não é possível amostrar por tempo")
+            interval = fps / self.sample_fps
+            count = int((end_frame - start_frame) / interval + 0.5)
+            selected = sorted({start_frame + int(round(k * interval)) for k in range(count + 1)})
+            selected = [n for n in selected if n < end_frame]
+        else:
+            selected = list(range(start_frame, end_frame))
+        return selected[::self.step]
+
+    def run(self):
+        """Executa a extração e retorna um ExtractionStats"""
+        stats = ExtractionStats(self.video_path, self.output_dir)
+        if self.sampling is not None:
+            self.sampler = FrameSampler(self.sampling, self.sampling_threshold)
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Erro ao abrir o vídeo: {self.video_path}")
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            # Zeros à esquerda suficientes para manter a ordem alfabética dos arquivos
+            self._name_width = max(4, len(str(max(video_frames - 1, 0))))
+            start_frame, end_frame = self.start_frame, self.end_frame
+            if self.start_time is not None or self.end_time is not None:
+                if fps <= 0:
+                    raise RuntimeError("FPS do vídeo desconhecido; não é possível usar intervalo por tempo")
+                if self.start_time is not None:
+                    start_frame = max(0, int(round(self.start_time * fps)))
+                if self.end_time is not None:
+                    end_frame = int(round(self.end_time * fps))
+            # Sem frame final explícito a leitura vai até o fim do arquivo,
+            # já que CAP_PROP_FRAME_COUNT é apenas uma estimativa em alguns containers
+            if end_frame is not None and video_frames > 0:
+                end_frame = min(int(end_frame), video_frames)
+
+            selected = None
+            # O container precisa saber de antemão quantos frames serão gravados
+            if self.is_sparse or self.container is not None:
+                selected = self._select_frames(start_frame, video_frames if end_frame is None else end_frame, fps)
+                if self.resume:
+                    # Na retomada de uma seleção esparsa ela fica limitada a CAP_PROP_FRAME_COUNT
+                    existing = self._existing_frames()
+                    missing = [n for n in selected if n not in existing]
+                    stats.frames_skipped = len(selected) - len(missing)
+                    selected = missing
+                stats.total_frames = len(selected)
+            else:
+                stats.total_frames = max(0, (video_frames if end_frame is None else end_frame) - start_frame)
+                if self.resume:
+                    # Retomada contínua: a leitura continua indo até o fim do arquivo, só sem regravar
+                    self.skip_frames = self._existing_frames()
+                if self.skip_frames:
+                    stats.frames_skipped = sum(1 for n in self.skip_frames
+                                               if n >= start_frame and (end_frame is None or n < end_frame))
+                    stats.total_frames = max(0, stats.total_frames - stats.frames_skipped)
+            # Depois da retomada, que compara a identidade anterior com a do vídeo atual
+            write_source_marker(self.output_dir, self.video_path)
+            frame_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+            if self.transform is not None:
+                frame_shape = self.transform.output_shape(frame_shape)
+            self._open_sink(stats.total_frames, frame_shape)
+
+            started = time.perf_counter()
+            try:
+                if self.processes > 1:
+                    cap.release()
+                    self._run_segments(stats, start_frame, end_frame, selected)
+                elif selected is not None:
+                    self._run_selected(cap, stats, selected)
+                else:
+                    self._run_serial(cap, stats, start_frame, end_frame)
+            finally:
+                if self.sink is not None:
+                    self.sink.close()
+            if self.container is not None and self.first_slot is None:
+                self._write_index(stats, fps, frame_shape)
+            if self.sampler is not None:
+                write_manifest(manifest_path(self.output_dir, self.video_name), self.video_path, self.sampler, fps,
+                               len(stats.manifest) + stats.frames_deduplicated, stats.manifest, stats.cancelled)
+            stats.elapsed = time.perf_counter() - started
+        finally:
+            cap.release()
+        return stats
+
+    def _open_sink(self, capacity, frame_shape):
+        if self.container is None:
+            return
+        if self.first_slot is not None:
+            # Processo do modo paralelo: o processo principal já criou o arquivo
+            self.sink = FrameArraySink(self.container_path)
+        elif self.container == 'array':
+            self.sink = FrameArraySink.create(self.container_path, capacity, frame_shape)
+        else:
+            self.sink = FrameArchiveSink(self.container_path, capacity, frame_shape)
+
+    def _write_index(self, stats, fps, frame_shape):
+        count = max((slot for _, _, slot in stats.index), default=-1) + 1
+        locate = self.sink.finalize(count)
+        write_index(self.index_path, self.container, self.container_path, self.video_path, fps,
+                    frame_shape, stats.index, locate, **self.sink.index_fields())
+
+    def _sample(self, cap, frame, frame_number, slot, stats):
+        """Amostragem por conteúdo: decide se o frame é gravado e o registra no manifesto"""
+        with profiler.stage('signature'):
+            keep, difference = self.sampler.accept(frame)
+        if not keep:
+            stats.frames_deduplicated += 1
+            return False
+        location = slot if self.sink is not None else os.path.basename(self._frame_path(frame_number))
+        stats.manifest.append((frame_number, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0, difference, location))
+        return True
+
+    def _run_serial(self, cap, stats, start_frame, end_frame):
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        frame_number = start_frame
+        done = 0
+        skip = self.skip_frames or ()
+        writers = FrameWriterPool(self._write, self.workers, self.max_pending, self.transform)
+        try:
+            while end_frame is None or frame_number < end_frame:
+                if frame_number in skip:
+                    # Já gravado: decodifica sem converter para manter a posição
+                    with profiler.stage('grab'):
+                        if not cap.grab():
+                            break
+                    frame_number += 1
+                    continue
+                with profiler.stage('read'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                # cap.read() devolve um novo array a cada chamada, sem necessidade de copiar
+                if self.sampler is None or self._sample(cap, frame, frame_number, None, stats):
+                    if not writers.submit(frame, frame_number, None, None, stats, stop_event=self.stop_event):
+                        break
+                    profiler.gauge('writer_queue', writers.queue.qsize())
+                frame_number += 1
+                done += 1
+                if self.progress_callback:
+                    self.progress_callback(done, stats.total_frames, writers.bytes_written)
+            stats.cancelled = self.stop_event.is_set()
+        finally:
+            writers.close(discard=stats.cancelled)
+            stats.frames_written = writers.written
+            stats.bytes_written = writers.bytes_written
+
+    def _should_seek(self, position, target):
+        """Decide entre seek e grab() sequencial para ir de ``position`` até ``target``"""
+        if target <= position:
+            return False
+        keyframes = self.keyframes
+        if keyframes:
+            # O seek só economiza decodificação se houver um keyframe no caminho
+            index = bisect.bisect_right(keyframes, target) - 1
+            return index >= 0 and keyframes[index] > position
+        return target - position > SEEK_THRESHOLD_FRAMES
+
+    def _run_selected(self, cap, stats, selected):
+        # O índice de keyframes só compensa (ffprobe lê todos os pacotes) se houver frames a pular
+        if len(selected) > 1 and not self.keyframes_only and selected[-1] - selected[0] >= len(selected):
+            self._get_keyframes()
+        position = 0
+        done = 0
+        slot = self.first_slot or 0
+        writers = FrameWriterPool(self._write, self.workers, self.max_pending, self.transform)
+        try:
+            for frame_number in selected:
+                if self._should_seek(position, frame_number):
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+                    position = frame_number
+                # grab() decodifica sem converter o frame; os frames pulados nunca são recuperados
+                with profiler.stage('grab'):
+                    while position < frame_number and cap.grab():
+                        position += 1
+                with profiler.stage('read'):
+                    ret, frame = cap.read()
+                if not ret or position < frame_number:
+                    break
+                position += 1
+                done += 1
+                if self.sampler is None or self._sample(cap, frame, frame_number, slot, stats):
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if self.sink is not None else None
+                    if not writers.submit(frame, frame_number, slot, timestamp, stats, stop_event=self.stop_event):
+                        break
+                    profiler.gauge('writer_queue', writers.queue.qsize())
+                    # Com a amostragem as posições no container avançam só para os frames gravados
+                    slot += 1
+                if self.progress_callback:
+                    self.progress_callback(done, stats.total_frames, writers.bytes_written)
+            stats.cancelled = self.stop_event.is_set()
+        finally:
+            writers.close(discard=stats.cancelled)
+            stats.frames_written = writers.written
+            stats.bytes_written = writers.bytes_written
+
+    def _run_segments(self, stats, start_frame, end_frame, selected=None):
+        last_frame = start_frame + stats.total_frames + stats.frames_skipped if end_frame is None else end_frame
+        if selected is not None:
+            last_frame = selected[-1] + 1 if selected else start_frame
+        keyframes = self._get_keyframes()
+        segments = plan_segments(start_frame, last_frame, self.processes * SEGMENTS_PER_PROCESS, keyframes)
+        if not segments:
+            return
+        if end_frame is None and selected is None:
+            # O último trecho lê até o fim do arquivo
+            segments[-1] = (segments[-1][0], None)
+
+        # spawn: a extração pode rodar em uma thread da fila (jobs.py), ao lado das threads de
+        # gravação de outros vídeos, e um fork de processo com várias threads pode travar
+        context = multiprocessing.get_context('spawn')
+        counter = context.Value('q', 0)
+        bytes_counter = context.Value('q', 0)
+        segment_stop = context.Event()
+        options = {
+            'image_format': self.image_format,
+            'quality': self.quality,
+            'keyframes': keyframes,
+            'container': self.container,
+            'video_name': self.video_name,
+            'transform': self.transform,
+        }
+        jobs = []
+        for start, end in segments:
+            job = dict(options, start_frame=start, end_frame=end)
+            if selected is not None:
+                first = bisect.bisect_left(selected, start)
+                job['frames'] = selected[first:bisect.bisect_left(selected, end)]
+                if not job['frames']:
+                    continue
+                if self.container is not None:
+                    job['first_slot'] = first
+            elif self.skip_frames:
+                job['skip_frames'] = [n for n in self.skip_frames if n >= start and (end is None or n < end)]
+            jobs.append(job)
+        if not jobs:
+            return
+        # As threads de gravação e o limite de frames em memória são do vídeo inteiro,
+        # divididos entre os processos que rodam ao mesmo tempo
+        processes = min(self.processes, len(jobs))
+        for job in jobs:
+            job['workers'] = max(1, self.workers // processes)
+            job['max_pending'] = max(1, self.max_pending // processes) if self.max_pending else None
+
+        output_root = os.path.dirname(self.output_dir)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes,
+                                                    mp_context=context,
+                                                    initializer=_init_segment_worker,
+                                                    initargs=(counter, bytes_counter, segment_stop,
+                                                              profiler.trace_path if profiler.enabled else None)) as pool:
+            futures = [pool.submit(_extract_segment, self.video_path, output_root, job) for job in jobs]
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=0.2)
+                # Interrompe os demais trechos em caso de cancelamento ou de erro em algum deles
+                if self.stop_event.is_set() or any(future.exception() for future in done):
+                    segment_stop.set()
+                if self.progress_callback:
+                    self.progress_callback(counter.value, stats.total_frames, bytes_counter.value)
+        results = [future.result() for future in futures]
+        stats.frames_written = sum(result.frames_written for result in results)
+        stats.bytes_written = sum(result.bytes_written for result in results)
+        for result in results:
+            stats.index.extend(result.index)
+        stats.cancelled = self.stop_event.is_set()
+
+
+# Estado dos processos de decodificação do modo paralelo, definido pelo initializer
+_segment_counter = None
+_segment_bytes = None
+_segment_stop = None
+
+
+def _init_segment_worker(counter, bytes_counter, stop_event, trace_path=None):
+    global _segment_counter, _segment_bytes, _segment_stop
+    _segment_counter = counter
+    _segment_bytes = bytes_counter
+    _segment_stop = stop_event
+    profiler.reset()
+    if trace_path is not None:
+        # Cada processo grava o próprio trace (<trace>.<pid>.json)
+        profiler.enable(trace_path)
+
+
+def _extract_segment(video_path, output_root, options):
+    """Extrai um trecho do vídeo com um VideoCapture próprio (executado em outro processo)"""
+    reported = [0, 0]
+
+    def progress(done, total, bytes_written):
+        with _segment_counter.get_lock():
+            _segment_counter.value += done - reported[0]
+        with _segment_bytes.get_lock():
+            _segment_bytes.value += bytes_written - reported[1]
+        reported[:] = [done, bytes_written]
+
+    extractor = FrameExtractor(video_path, output_root, progress_callback=progress,
+                               stop_event=_segment_stop, **options)
+    try:
+        return extractor.run()
+    finally:
+        # Os processos do pool podem terminar sem executar o atexit
+        if profiler.enabled:
+            profiler.write_trace(profiler.trace_path)
+
+
+def extract_video(video_path, output_dir, **options):
+    """Atalho para FrameExtractor(video_path, output_dir, **options).run()"""
+    return FrameExtractor(video_path, output_dir, **options).run()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Extrai os frames de um ou mais vídeos sem interface gráfica.")
+    parser.add_argument('videos', nargs='+', help="Arquivo(s) de vídeo de entrada")
+    parser.add_argument('-o', '--output-dir', required=True, help="Pasta de destino (uma subpasta é criada por vídeo)")
+    parser.add_argument('-f', '--format', dest='image_format', choices=sorted(OUTPUT_FORMATS),
+                        default=DEFAULT_FORMAT, help="Formato das imagens geradas")
+    parser.add_argument('-q', '--quality', type=int, default=None,
+                        help="Qualidade JPEG (0-100) / WebP (1-100) ou nível de compressão PNG (0-9)")
+    parser.add_argument('--start', dest='start_frame', type=int, default=0, help="Primeiro frame a extrair")
+    parser.add_argument('--end', dest='end_frame', type=int, default=None, help="Frame final (exclusivo)")
+    parser.add_argument('--start-time', type=float, default=None, help="Início do intervalo em segundos")
+    parser.add_argument('--end-time', type=float, default=None, help="Fim do intervalo em segundos")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument('--step', type=int, default=1, help="Extrai um frame a cada N")
+    selection.add_argument('--sample-fps', type=float, default=None, help="Extrai N frames por segundo de vídeo")
+    selection.add_argument('--keyframes', dest='keyframes_only', action='store_true',
+                           help="Extrai apenas os keyframes (requer ffprobe)")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="Threads de gravação")
+    parser.add_argument('--container', choices=CONTAINER_TYPES, default=None,
+                        help="Grava todos os frames em um único arquivo com índice (array = .npy mapeado "
+                             "em memória, archive = .npz comprimido em blocos)")
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help="Processos de decodificação em paralelo, um trecho do vídeo por vez (0 = todos os núcleos)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="Máximo de frames decodificados em memória aguardando gravação")
+    parser.add_argument('--resume', action='store_true',
+                        help="Pula os frames que já existem na pasta de saída (continua uma extração interrompida)")
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument('--skip-duplicates', dest='sampling', action='store_const', const='dedup',
+                          help="Descarta frames quase iguais ao último gravado (ver dedup.py)")
+    sampling.add_argument('--scene-changes', dest='sampling', action='store_const', const='scenes',
+                          help="Grava apenas os frames em que a cena muda")
+    parser.add_argument('--threshold', dest='sampling_threshold', type=float, default=None,
+                        help="Diferença mínima (0-1) para gravar um frame com --skip-duplicates/--scene-changes "
+                             f"(padrão: {DEFAULT_THRESHOLDS['dedup']} / {DEFAULT_THRESHOLDS['scenes']})")
+    transform = parser.add_argument_group("transformação dos frames (ver transforms.py)")
+    transform.add_argument('--size', type=parse_size, default=None, metavar='LxA',
+                           help="Redimensiona para LARGURAxALTURA (ex.: 512x512)")
+    transform.add_argument('--resize-mode', choices=RESIZE_MODES, default='letterbox',
+                           help="letterbox = mantém a proporção com bordas pretas, fit = mantém a proporção "
+                                "sem bordas, stretch = ocupa o tamanho exato")
+    transform.add_argument('--crop', type=parse_crop, default=None, metavar='X,Y,L,A',
+                           help="Recorta a região X,Y,LARGURA,ALTURA antes de redimensionar")
+    transform.add_argument('--color', choices=sorted(COLOR_CONVERSIONS), default=None,
+                           help="Converte o espaço de cor (os frames decodificados são BGR)")
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_TRACE_PATH, default=None, metavar='TRACE',
+                        help="Mede o tempo de cada etapa e grava um trace no formato Chrome "
+                             f"(padrão: {DEFAULT_TRACE_PATH})")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    options = vars(args)
+    videos = options.pop('videos')
+    output_dir = options.pop('output_dir')
+    trace_path = options.pop('profile')
+    if trace_path:
+        profiler.enable(trace_path)
+    options['transform'] = transform_from_options(options)
+    exit_code = 0
+    taken = set()
+    for video_path in videos:
+        try:
+            # Vídeos de mesmo nome não dividem a pasta de saída
+            video_name = output_name(output_dir, video_path, taken)
+            taken.add(os.path.abspath(os.path.join(output_dir, video_name)))
+            stats = extract_video(video_path, output_dir, video_name=video_name, **options)
+        except Exception as e:
+            print(f"Erro durante a extração de {video_path}: {e}", file=sys.stderr)
+            exit_code = 1
+            continue
+        skipped = f", {stats.frames_skipped} já existentes" if stats.frames_skipped else ""
+        if stats.frames_deduplicated:
+            skipped += f", {stats.frames_deduplicated} descartados pela amostragem"
+        print(f"{video_path}: {stats.frames_written} frames em {stats.elapsed:.2f}s "
+              f"({stats.frames_per_second:.1f} frames/s{skipped}) -> {stats.output_dir}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""Fila de extrações em lote: vários vídeos, ou pastas inteiras, em uma só execução.
+
+    python jobs.py /gravacoes/dia1 /gravacoes/dia2/take3.mov -o /saida --jobs 2 --workers 8
+
+O orçamento é global para a fila: no máximo ``max_jobs`` vídeos são extraídos
+ao mesmo tempo e as ``workers`` threads de gravação são divididas entre os que
+estão sendo extraídos (um vídeo sozinho usa todas); no modo paralelo a parte de
+cada vídeo é dividida de novo entre os seus processos. Já ``processes`` vale por
+vídeo: até ``max_jobs * processes`` decodificadores rodam ao mesmo tempo.
+
+As extrações rodam com retomada: executar a mesma fila de novo pula os frames
+já gravados, de modo que um lote interrompido continua de onde parou.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+from profiling import profiler
+from extractor import DEFAULT_WORKERS, FrameExtractor, build_arg_parser as build_extractor_arg_parser, output_name
+from transforms import transform_from_options
+
+# Extensões reconhecidas ao adicionar uma pasta (as mesmas do diálogo do aplicativo)
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.gif')
+DEFAULT_MAX_JOBS = 2
+
+# Estados de uma ExtractionJob
+PENDING = 'pendente'
+RUNNING = 'extraindo'
+DONE = 'concluído'
+FAILED = 'erro'
+CANCELLED = 'cancelado'
+
+
+def find_videos(paths, recursive=False):
+    """Expande pastas em seus arquivos de vídeo (em ordem alfabética); arquivos passam direto"""
+    videos = []
+    for path in paths:
+        if not os.path.isdir(path):
+            videos.append(path)
+            continue
+        if recursive:
+            found = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        else:
+            found = [entry.path for entry in os.scandir(path) if entry.is_file()]
+        videos.extend(sorted(p for p in found if p.lower().endswith(VIDEO_EXTENSIONS)))
+    return videos
+
+
+class ExtractionJob:
+    """Um vídeo da fila, com seu estado e vazão"""
+
+    def __init__(self, video_path, output_dir, options):
+        self.video_path = video_path
+        self.output_dir = output_dir
+        self.options = options
+        self.status = PENDING
+        self.stats = None
+        self.error = None
+        self.frames_done = 0
+        self.total_frames = 0
+        self.bytes_written = 0
+        self.started = None
+        self.finished = None
+        self.stop_event = threading.Event()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def frames_per_second(self):
+        elapsed = self.elapsed
+        return self.frames_done / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'video_path': self.video_path,
+            'status': self.status,
+            'frames_done': self.frames_done,
+            'total_frames': self.total_frames,
+            'bytes_written': self.bytes_written,
+            'elapsed': self.elapsed,
+            'frames_per_second': self.frames_per_second,
+            'error': str(self.error) if self.error is not None else None,
+            'stats': self.stats.as_dict() if self.stats is not None else None,
+        }
+
+
+class ExtractionQueue:
+    """Executa ExtractionJobs com no máximo ``max_jobs`` simultâneas.
+
+    ``workers`` é o total de threads de gravação da fila, dividido entre as
+    extrações simultâneas. ``progress_callback(job)`` e ``job_callback(job)``
+    (ao fim de cada vídeo) são chamados nas threads da fila. Os demais
+    argumentos são repassados ao FrameExtractor de cada vídeo.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, workers=DEFAULT_WORKERS, progress_callback=None,
+                 job_callback=None, **options):
+        self.max_jobs = max(1, int(max_jobs))
+        self.workers = max(1, int(workers))
+        self.progress_callback = progress_callback
+        self.job_callback = job_callback
+        self.options = options
+        self.jobs = []
+        self.started = None
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+
+    @property
+    def workers_per_job(self):
+        """Threads de gravação de uma extração que está começando: o orçamento dividido entre
+        as extrações simultâneas (em andamento ou na fila, até max_jobs). O número fica fixo
+        durante a extração: ela não cede threads a um vídeo adicionado depois que começou."""
+        with self._lock:
+            active = sum(1 for job in self.jobs if job.status in (PENDING, RUNNING))
+        return max(1, self.workers // min(self.max_jobs, max(1, active)))
+
+    def add(self, video_path, output_dir, **options):
+        """Enfileira um vídeo; opções informadas aqui têm precedência sobre as da fila.
+
+        Se o mesmo vídeo já está na fila para o mesmo destino, retorna essa extração
+        em vez de criar outra na mesma pasta. Vídeos de mesmo nome (take1.mp4 e
+        take1.avi) recebem pastas diferentes (ver extractor.output_name).
+        """
+        options = dict(self.options, **options)
+        # Retomada por padrão, exceto onde ela não é suportada (container ou amostragem por conteúdo)
+        options.setdefault('resume', options.get('container') is None and options.get('sampling') is None)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("A fila já foi encerrada")
+            active = [job for job in self.jobs if job.status in (PENDING, RUNNING)]
+            for job in active:
+                if (os.path.abspath(job.video_path) == os.path.abspath(video_path)
+                        and os.path.abspath(job.output_dir) == os.path.abspath(output_dir)):
+                    return job
+            taken = {os.path.abspath(os.path.join(job.output_dir, job.options['video_name'])) for job in active}
+            if not options.get('video_name'):
+                options['video_name'] = output_name(output_dir, video_path, taken)
+            job = ExtractionJob(video_path, output_dir, options)
+            self.jobs.append(job)
+            self._pending.put(job)
+            if self.started is None:
+                self.started = time.perf_counter()
+            # As threads são criadas sob demanda, até o limite de extrações simultâneas
+            if len(self._threads) < self.max_jobs:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        return job
+
+    def add_paths(self, paths, output_dir, recursive=False, **options):
+        """Enfileira os vídeos de uma lista de arquivos e/ou pastas"""
+        return [self.add(video_path, output_dir, **options) for video_path in find_videos(paths, recursive)]
+
+    def _worker(self):
+        while True:
+            try:
+                job = self._pending.get(timeout=0.5)
+            except queue.Empty:
+                with self._lock:
+                    # Sem trabalho: a thread termina e será recriada no próximo add()
+                    if self._pending.empty():
+                        self._threads.remove(threading.current_thread())
+                        return
+                continue
+            if job is None:
+                return
+            self._run_job(job)
+
+    def _run_job(self, job):
+        if job.stop_event.is_set():
+            job.status = CANCELLED
+            job.finished = time.perf_counter()
+            self._notify_done(job)
+            return
+
+        def progress(done, total, bytes_written):
+            job.frames_done = done
+            job.total_frames = total
+            job.bytes_written = bytes_written
+            if self.progress_callback:
+                self.progress_callback(job)
+
+        job.status = RUNNING
+        job.started = time.perf_counter()
+        try:
+            extractor = FrameExtractor(job.video_path, job.output_dir, workers=self.workers_per_job,
+                                       progress_callback=progress, stop_event=job.stop_event, **job.options)
+            job.stats = extractor.run()
+            job.frames_done = job.stats.frames_written
+            job.total_frames = job.stats.total_frames
+            job.bytes_written = job.stats.bytes_written
+            job.status = CANCELLED if job.stats.cancelled else DONE
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+        job.finished = time.perf_counter()
+        self._notify_done(job)
+
+    def _notify_done(self, job):
+        if self.job_callback:
+            self.job_callback(job)
+
+    def cancel(self):
+        """Cancela as extrações em andamento e as que ainda não começaram"""
+        for job in list(self.jobs):
+            job.stop_event.set()
+
+    def close(self):
+        """Não aceita novos vídeos e aguarda o fim dos que estão na fila"""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+            for _ in threads:
+                self._pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    def clear_finished(self):
+        """Remove os vídeos já encerrados; a vazão agregada passa a contar a partir dos próximos"""
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.status in (PENDING, RUNNING)]
+            if not self.jobs:
+                self.started = None
+
+    @property
+    def idle(self):
+        return all(job.status not in (PENDING, RUNNING) for job in self.jobs)
+
+    @property
+    def frames_done(self):
+        return sum(job.frames_done for job in self.jobs)
+
+    @property
+    def total_frames(self):
+        return sum(job.total_frames for job in self.jobs)
+
+    @property
+    def bytes_written(self):
+        return sum(job.bytes_written for job in self.jobs)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        finished = [job.finished for job in self.jobs]
+        if self.idle and all(finished):
+            return max(finished) - self.started
+        return time.perf_counter() - self.started
+
+    @property
+    def frames_per_second(self):
+        """Vazão agregada de todas as extrações da fila"""
+        elapsed = self.elapsed
+        return self.frames_done / elapsed if elapsed > 0 else 0.0
+
+    def summary(self):
+        counts = {}
+        for job in self.jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'jobs': [job.as_dict() for job in self.jobs],
+            'status': counts,
+            'frames_done': self.frames_done,
+            'bytes_written': self.bytes_written,
+            'elapsed': self.elapsed,
+            'frames_per_second': self.frames_per_second,
+        }
+
+
+def build_arg_parser():
+    parser = build_extractor_arg_parser()
+    parser.description = ("Extrai os frames de vários vídeos (arquivos ou pastas) em uma fila com "
+                          "orçamento global de decodificadores e threads de gravação.")
+    parser.add_argument('--jobs', dest='max_jobs', type=int, default=DEFAULT_MAX_JOBS,
+                        help="Vídeos extraídos ao mesmo tempo")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Procura vídeos também nas subpastas")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    options = vars(args)
+    paths = options.pop('videos')
+    output_dir = options.pop('output_dir')
+    recursive = options.pop('recursive')
+    trace_path = options.pop('profile')
+    if trace_path:
+        profiler.enable(trace_path)
+    options['transform'] = transform_from_options(options)
+    options.pop('resume')  # A fila sempre retoma extrações por arquivo
+
+    def report(job):
+        if job.status == FAILED:
+            print(f"Erro durante a extração de {job.video_path}: {job.error}", file=sys.stderr)
+        else:
+            print(f"{job.video_path}: {job.status}, {job.frames_done} frames em {job.elapsed:.2f}s "
+                  f"({job.frames_per_second:.1f} frames/s)")
+
+    extraction_queue = ExtractionQueue(job_callback=report, **options)
+    jobs = extraction_queue.add_paths(paths, output_dir, recursive)
+    if not jobs:
+        print("Nenhum vídeo encontrado.", file=sys.stderr)
+        return 1
+    try:
+        extraction_queue.close()
+    except KeyboardInterrupt:
+        extraction_queue.cancel()
+        extraction_queue.close()
+    print(f"Total: {len(jobs)} vídeos, {extraction_queue.frames_done} frames em {extraction_queue.elapsed:.2f}s "
+          f"({extraction_queue.frames_per_second:.1f} frames/s)")
+    return 1 if any(job.status == FAILED for job in jobs) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
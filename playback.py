@@ -0,0 +1,483 @@
+"""Reprodução do preview com decodificação antecipada.
+
+Uma thread de decodificação lê os frames, ajusta ao tamanho da janela (com
+tarjas pretas, mantendo a proporção), converte para RGBA e os deposita em um
+buffer circular pequeno. Redimensionamento e conversão escrevem direto
+(``dst=``) em canvases pré-alocados do tamanho da janela, reutilizados entre
+frames (CanvasPool), de modo que o caminho de exibição não aloca por frame. A interface apenas apresenta, no instante indicado por um
+relógio de reprodução, o frame mais recente que já venceu, descartando os atrasados.
+
+O relógio (AVSyncClock) segue a posição do áudio quando há trilha tocando, ou o
+relógio de parede quando não há; se a decodificação ficar para trás além da
+tolerância, o leitor pula frames sem convertê-los até alcançar o relógio.
+"""
+import collections
+import functools
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from probe import probe_video
+from profiling import profiler
+
+DEFAULT_BUFFER_FRAMES = 8
+# Diferença máxima aceita entre vídeo e áudio antes de ressincronizar (segundos)
+DEFAULT_SYNC_TOLERANCE = 0.040
+
+
+@functools.lru_cache(maxsize=32)
+def letterbox_geometry(img_width, img_height, window_width, window_height):
+    """Retorna (x, y, largura, altura) da imagem redimensionada e centralizada na janela"""
+    aspect_ratio = img_width / img_height
+    # Calcula novas dimensões que cabem na janela mantendo a proporção
+    if window_width / window_height > aspect_ratio:
+        # Limita pela altura
+        new_height = window_height
+        new_width = max(1, int(new_height * aspect_ratio))
+    else:
+        # Limita pela largura
+        new_width = window_width
+        new_height = max(1, int(new_width / aspect_ratio))
+    return (window_width - new_width) // 2, (window_height - new_height) // 2, new_width, new_height
+
+
+def fit_frame(frame, window_width, window_height):
+    """Redimensiona o frame para caber na janela mantendo a proporção, centralizado em fundo preto"""
+    img_height, img_width = frame.shape[:2]
+    if window_width <= 1 or window_height <= 1:
+        return frame
+    x_offset, y_offset, new_width, new_height = letterbox_geometry(img_width, img_height,
+                                                                   window_width, window_height)
+    bg = np.zeros((window_height, window_width) + frame.shape[2:], dtype=frame.dtype)
+    cv2.resize(frame, (new_width, new_height),
+               dst=bg[y_offset:y_offset + new_height, x_offset:x_offset + new_width])
+    return bg
+
+
+class RenderCanvas:
+    """Buffer RGBA do tamanho da janela, reaproveitado entre frames.
+
+    ``image`` guarda, para a interface, uma imagem PIL que compartilha a
+    memória de ``array`` (criada uma vez por canvas).
+    """
+    __slots__ = ('array', 'size', 'image')
+
+    def __init__(self, size):
+        width, height = size
+        self.size = size
+        self.array = np.zeros((height, width, 4), dtype=np.uint8)
+        self.array[..., 3] = 255  # Tarjas pretas opacas
+        self.image = None
+
+
+class CanvasPool:
+    """Conjunto limitado de RenderCanvas do tamanho atual da janela.
+
+    ``acquire`` bloqueia enquanto todos estiverem em uso, limitando quantos
+    frames prontos existem ao mesmo tempo. Ao mudar o tamanho da janela os
+    canvases antigos são descartados à medida que são devolvidos.
+    """
+
+    def __init__(self, count):
+        self.count = max(1, count)
+        self.size = None
+        self._free = []
+        self._outstanding = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size, stop_event):
+        with self._condition:
+            if size != self.size:
+                self.size = size
+                self._free.clear()
+            while not self._free and self._outstanding >= self.count:
+                if stop_event.is_set():
+                    return None
+                self._condition.wait(0.1)
+            canvas = self._free.pop() if self._free else RenderCanvas(size)
+            self._outstanding += 1
+            return canvas
+
+    def release(self, canvas):
+        with self._condition:
+            self._outstanding -= 1
+            if canvas.size == self.size:
+                self._free.append(canvas)
+            self._condition.notify_all()
+
+
+class DecodedFrame:
+    """Frame pronto para exibição e o instante em que deve ser apresentado"""
+    __slots__ = ('frame_number', 'timestamp', 'canvas', 'loop')
+
+    def __init__(self, frame_number, timestamp, canvas, loop=0):
+        self.frame_number = frame_number
+        # Segundos desde o início da reprodução (cresce a cada volta do loop)
+        self.timestamp = timestamp
+        self.canvas = canvas
+        # Trecho da reprodução: muda a cada volta do loop e a cada seek
+        self.loop = loop
+
+    @property
+    def image(self):
+        """Array RGBA (altura, largura, 4) do frame"""
+        return self.canvas.array
+
+
+class FrameRingBuffer:
+    """Buffer limitado e thread-safe entre a decodificação e a apresentação"""
+
+    def __init__(self, capacity=DEFAULT_BUFFER_FRAMES, on_discard=None):
+        self.capacity = max(1, capacity)
+        # Chamado com cada frame descartado sem ser apresentado
+        self.on_discard = on_discard
+        self._frames = collections.deque()
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._frames)
+
+    def put(self, item, stop_event):
+        """Adiciona um frame, aguardando espaço; retorna False se ``stop_event`` for sinalizado"""
+        with self._condition:
+            while len(self._frames) >= self.capacity:
+                if stop_event.is_set():
+                    return False
+                self._condition.wait(0.1)
+            self._frames.append(item)
+            return True
+
+    def peek(self):
+        with self._condition:
+            return self._frames[0] if self._frames else None
+
+    def pop(self):
+        """Remove e retorna o primeiro frame, ou None se o buffer está vazio"""
+        with self._condition:
+            if not self._frames:
+                return None
+            self._condition.notify_all()
+            return self._frames.popleft()
+
+    def discard_before(self, loop):
+        """Descarta os frames do início do buffer que pertencem a trechos anteriores a ``loop``"""
+        with self._condition:
+            discarded = 0
+            while self._frames and self._frames[0].loop < loop:
+                item = self._frames.popleft()
+                if self.on_discard is not None:
+                    self.on_discard(item)
+                discarded += 1
+            if discarded:
+                self._condition.notify_all()
+            return discarded
+
+    def pop_due(self, clock_time):
+        """Remove os frames cujo instante já passou.
+
+        Retorna (frame mais recente vencido ou None, quantidade de frames descartados).
+        """
+        with self._condition:
+            latest = None
+            dropped = 0
+            while self._frames and self._frames[0].timestamp <= clock_time:
+                if latest is not None:
+                    dropped += 1
+                    if self.on_discard is not None:
+                        self.on_discard(latest)
+                latest = self._frames.popleft()
+            if latest is not None:
+                self._condition.notify_all()
+            return latest, dropped
+
+    def clear(self):
+        with self._condition:
+            if self.on_discard is not None:
+                for item in self._frames:
+                    self.on_discard(item)
+            self._frames.clear()
+            self._condition.notify_all()
+
+
+class MonotonicClock:
+    """Relógio de reprodução baseado em time.monotonic(), com pausa"""
+
+    def __init__(self):
+        self._started = None
+        self._paused_at = None
+
+    def start(self, position=0.0):
+        self._started = time.monotonic() - position
+        self._paused_at = None
+
+    def pause(self):
+        if self._paused_at is None and self._started is not None:
+            self._paused_at = time.monotonic()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._started += time.monotonic() - self._paused_at
+            self._paused_at = None
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    def time(self):
+        """Posição atual da reprodução em segundos"""
+        if self._started is None:
+            return 0.0
+        return (self._paused_at or time.monotonic()) - self._started
+
+
+class AVSyncClock:
+    """Relógio de reprodução escravo do áudio.
+
+    ``audio_position()`` deve retornar os segundos tocados desde o último play
+    do áudio, ou None quando não há áudio tocando; nesse caso vale o relógio de
+    parede. Entre as atualizações (grosseiras) do áudio o relógio de parede
+    interpola, e é corrigido sempre que se afasta mais de ``tolerance`` do áudio.
+    """
+
+    def __init__(self, audio_position=None, tolerance=DEFAULT_SYNC_TOLERANCE):
+        self.audio_position = audio_position
+        self.tolerance = tolerance
+        self.wall = MonotonicClock()
+        # Posição do vídeo em que o áudio atual começou (muda a cada volta do loop)
+        self._audio_base = 0.0
+        # Atraso medido do último frame apresentado em relação ao relógio (positivo = vídeo atrasado)
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.resyncs = 0
+
+    def start(self, position=0.0):
+        self.wall.start(position)
+        self._audio_base = position
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.resyncs = 0
+
+    def restart_audio(self, position):
+        """Informa que o áudio foi reiniciado (play) na posição ``position`` do vídeo"""
+        self._audio_base = position
+        self.wall.start(position)
+
+    def pause(self):
+        self.wall.pause()
+
+    def resume(self):
+        self.wall.resume()
+
+    @property
+    def paused(self):
+        return self.wall.paused
+
+    def audio_time(self):
+        """Posição do áudio em segundos de vídeo, ou None sem áudio"""
+        if self.audio_position is None:
+            return None
+        position = self.audio_position()
+        return None if position is None else self._audio_base + position
+
+    def time(self):
+        """Posição atual da reprodução em segundos"""
+        wall_time = self.wall.time()
+        audio_time = self.audio_time()
+        if audio_time is not None and abs(wall_time - audio_time) > self.tolerance:
+            self.wall.start(audio_time)
+            if self.paused:
+                self.wall.pause()
+            self.resyncs += 1
+            return audio_time
+        return wall_time
+
+    def record_presentation(self, timestamp):
+        """Registra a apresentação de um frame e atualiza o drift medido"""
+        self.drift = self.time() - timestamp
+        self.max_drift = max(self.max_drift, abs(self.drift))
+        return self.drift
+
+
+class DecodeAheadReader:
+    """Thread de decodificação do preview.
+
+    ``target_size`` (largura, altura) é atualizado pela interface; cada frame é
+    ajustado a esse tamanho e convertido para RGBA em um canvas do CanvasPool
+    antes de entrar no buffer. Quem consome os frames devolve cada canvas com
+    ``release`` quando não precisar mais dele. Ao chegar ao fim do arquivo a
+    leitura recomeça do início (``loop``).
+
+    O decodificador só é aberto dentro da thread, em ``start``; fps e número
+    de frames vêm de ``info`` (probe.VideoInfo), consultado se não for passado.
+    Se a abertura falhar, ``error`` recebe a exceção e ``finished`` é sinalizado.
+
+    ``seek`` reposiciona a leitura. Cada volta do loop e cada seek começam um
+    trecho novo, com número (``DecodedFrame.loop``) maior que os anteriores;
+    após um seek os timestamps voltam a ser contados do início do arquivo.
+    Frames de trechos antigos que ainda cheguem ao buffer devem ser ignorados
+    por quem consome.
+    """
+
+    def __init__(self, video_path, buffer_frames=DEFAULT_BUFFER_FRAMES, loop=True, info=None):
+        self.video_path = video_path
+        if info is None:
+            info = probe_video(video_path)
+        self.fps = info.fps if info.fps > 0 else 30.0
+        self.frame_interval = 1.0 / self.fps
+        self.total_frames = info.frame_count
+        self.cap = None
+        self.error = None
+        self.loop = loop
+        self.buffer = FrameRingBuffer(buffer_frames, on_discard=self.release)
+        # Frames no buffer + o que está na tela + o que está sendo preparado
+        self.canvases = CanvasPool(buffer_frames + 2)
+        self.target_size = None
+        self._decoded = None  # Frame BGR decodificado, reaproveitado por cap.read()
+        self._scratch = None  # Frame BGR redimensionado, reaproveitado entre frames
+        self.finished = threading.Event()
+        self.skipped_frames = 0
+        self._skip_until = None
+        self._loops = 0
+        self._seek_request = None  # (frame, keyframe anterior ou None, trecho)
+        self._seek_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self.buffer.clear()
+        # Enquanto o arquivo ainda está sendo aberto não há o que esperar:
+        # a thread encerra sozinha ao terminar a abertura
+        if self._thread is not None and self._thread is not threading.current_thread() and self.cap is not None:
+            self._thread.join()
+
+    def skip_until(self, timestamp):
+        """Pede à decodificação que descarte, sem converter, os frames anteriores a ``timestamp``"""
+        self._skip_until = timestamp
+
+    def seek(self, frame_number, keyframe=None):
+        """Pede que a leitura continue em ``frame_number`` e retorna o número do novo trecho.
+
+        ``keyframe`` é o keyframe em ou antes do frame, se conhecido: a leitura
+        posiciona nele e avança com grab() até o frame pedido, desistindo se um
+        seek mais novo chegar no meio do caminho (como ao arrastar a linha do tempo).
+        """
+        with self._seek_lock:
+            loop = self._new_loop()
+            self._seek_request = (max(0, frame_number), keyframe, loop)
+        self.buffer.clear()
+        return loop
+
+    def _new_loop(self):
+        self._loops += 1
+        return self._loops
+
+    def _seek(self, frame_number, keyframe):
+        if keyframe is None or not 0 <= keyframe <= frame_number:
+            keyframe = frame_number
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        for _ in range(frame_number - keyframe):
+            if self._stop_event.is_set() or self._seek_request is not None:
+                return False
+            if not self.cap.grab():
+                break
+        return True
+
+    def release(self, item):
+        """Devolve ao pool o canvas de um frame que já foi apresentado ou descartado"""
+        self.canvases.release(item.canvas)
+
+    def _render(self, frame):
+        img_height, img_width = frame.shape[:2]
+        size = self.target_size
+        if size is None or size[0] <= 1 or size[1] <= 1:
+            size = (img_width, img_height)
+        canvas = self.canvases.acquire(size, self._stop_event)
+        if canvas is None:
+            return None
+        x, y, width, height = letterbox_geometry(img_width, img_height, *size)
+        target = canvas.array[y:y + height, x:x + width]
+        if (width, height) != (img_width, img_height):
+            if self._scratch is None or self._scratch.shape[:2] != (height, width):
+                self._scratch = np.empty((height, width, 3), dtype=np.uint8)
+            with profiler.stage('resize'):
+                frame = cv2.resize(frame, (width, height), dst=self._scratch)
+        with profiler.stage('cvtColor'):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=target)
+        return canvas
+
+    def _run(self):
+        loop = 0
+        loop_offset = 0.0
+        last_timestamp = 0.0
+        frames_in_loop = 0
+        seeked = False
+        try:
+            cap = cv2.VideoCapture(self.video_path)
+            if not cap.isOpened():
+                cap.release()
+                self.error = IOError(f"Não foi possível abrir o vídeo: {self.video_path}")
+                return
+            self.cap = cap
+            while not self._stop_event.is_set():
+                if self._seek_request is not None:
+                    with self._seek_lock:
+                        request, self._seek_request = self._seek_request, None
+                    frame_number, keyframe, loop = request
+                    self._skip_until = None
+                    loop_offset = 0.0
+                    last_timestamp = (frame_number - 1) * self.frame_interval
+                    frames_in_loop = 0
+                    seeked = True
+                    with profiler.stage('seek'):
+                        completed = self._seek(frame_number, keyframe)
+                    if not completed:
+                        continue  # Interrompido por um seek mais novo
+                skip_until = self._skip_until
+                if skip_until is not None:
+                    next_timestamp = loop_offset + self.cap.get(cv2.CAP_PROP_POS_FRAMES) * self.frame_interval
+                    if next_timestamp < skip_until and self.cap.grab():
+                        # Frame atrasado: decodificado mas nunca convertido nem redimensionado
+                        frames_in_loop += 1
+                        self.skipped_frames += 1
+                        profiler.count('preview_skipped')
+                        last_timestamp = next_timestamp
+                        continue
+                    self._skip_until = None
+                with profiler.stage('read'):
+                    ret, frame = self.cap.read(self._decoded)
+                if not ret:
+                    # Arquivo sem frames (e não apenas um seek além do fim): não há o que repetir
+                    if not self.loop or (frames_in_loop == 0 and not seeked):
+                        break
+                    # Recomeça do início; o tempo de apresentação continua crescendo
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    with self._seek_lock:
+                        loop = self._new_loop()
+                    loop_offset = last_timestamp + self.frame_interval
+                    frames_in_loop = 0
+                    seeked = False
+                    continue
+                self._decoded = frame
+                frames_in_loop += 1
+                frame_number = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+                last_timestamp = loop_offset + frame_number * self.frame_interval
+                canvas = self._render(frame)
+                if canvas is None:
+                    break
+                item = DecodedFrame(frame_number, last_timestamp, canvas, loop)
+                if not self.buffer.put(item, self._stop_event):
+                    self.release(item)
+                    break
+                profiler.gauge('preview_buffer', len(self.buffer))
+        finally:
+            if self.cap is not None:
+                self.cap.release()
+            self.finished.set()
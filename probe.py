@@ -0,0 +1,84 @@
+"""Metadados dos vídeos (dimensões, fps, número de frames), com cache em disco.
+
+A primeira abertura de um arquivo consulta o OpenCV; as seguintes leem o
+resultado do cache (ver cache.py), desde que o arquivo não tenha mudado.
+"""
+import json
+import os
+
+import cv2
+
+import cache
+
+# Incrementar quando os campos gravados mudarem, invalidando o cache antigo
+PROBE_VERSION = 1
+
+
+class VideoInfo:
+    """Metadados de um vídeo"""
+
+    def __init__(self, path, width, height, fps, frame_count, file_size):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.file_size = file_size
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'fps': self.fps,
+            'frame_count': self.frame_count,
+            'file_size': self.file_size,
+        }
+
+    @classmethod
+    def from_dict(cls, path, data):
+        return cls(path, data['width'], data['height'], data['fps'], data['frame_count'], data['file_size'])
+
+
+def _probe_capture(video_path):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Não foi possível abrir o vídeo: {video_path}")
+        return VideoInfo(video_path,
+                         width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                         height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                         fps=cap.get(cv2.CAP_PROP_FPS),
+                         frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+                         file_size=os.path.getsize(video_path))
+    finally:
+        cap.release()
+
+
+def probe_video(video_path, use_cache=True):
+    """Retorna o VideoInfo do arquivo; levanta IOError se ele não puder ser aberto.
+
+    Pode ser lento (arquivos grandes ou em rede) na primeira chamada; a
+    interface deve chamá-la fora do thread do Tk.
+    """
+    if not use_cache:
+        return _probe_capture(video_path)
+    path = cache.cache_path('probe', video_path, '.json', PROBE_VERSION)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return VideoInfo.from_dict(video_path, json.load(f))
+    except (OSError, ValueError, KeyError):
+        pass
+    info = _probe_capture(video_path)
+    try:
+        # Grava em um arquivo temporário e renomeia, para nunca deixar um JSON pela metade
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info.as_dict(), f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o cache de metadados: {e}")
+    return info
@@ -0,0 +1,225 @@
+"""Instrumentação opcional dos caminhos quentes (leitura, conversão, redimensionamento, gravação).
+
+Ativada pela variável de ambiente VID_PROFILE (ou ``--profile`` na linha de
+comando do extractor.py/jobs.py):
+
+    VID_PROFILE=1 python vid.py                  # trace em vid_trace.json
+    VID_PROFILE=/tmp/perfil.json python vid.py   # trace no caminho indicado
+
+Desligada, ``profiler.stage()`` devolve um context manager nulo compartilhado e
+o custo por chamada é desprezível. Ligada, cada etapa medida gera um intervalo
+por thread; ao fim do processo são impressos um resumo por etapa (contagem,
+total, média, p50/p95/máximo), contadores (frames descartados...), a maior
+profundidade de cada fila e o pico de memória, e gravado um trace no formato
+Chrome (abrir em chrome://tracing ou https://ui.perfetto.dev).
+"""
+import atexit
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENV_VAR = 'VID_PROFILE'
+DEFAULT_TRACE_PATH = 'vid_trace.json'
+# Limite de eventos guardados para o trace (as estatísticas continuam sendo contadas)
+MAX_TRACE_EVENTS = 1000000
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def peak_rss(children=False):
+    """Pico de memória residente do processo em bytes (None se não for possível medir).
+
+    Com ``children=True``, o maior pico entre os processos filhos já encerrados
+    (apenas onde o módulo ``resource`` existe).
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if sys.platform == 'win32' and not children:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+def _percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    """Coleta tempos por etapa, contadores e profundidade de filas"""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.origin = time.perf_counter()
+        self._durations = collections.defaultdict(list)
+        self._counters = collections.Counter()
+        self._gauges = {}
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Desliga a coleta e descarta o que foi coletado (usado nos processos do modo paralelo)"""
+        self.enabled = False
+        self.origin = time.perf_counter()
+        self._durations.clear()
+        self._counters.clear()
+        self._gauges.clear()
+        self._events.clear()
+        self._threads.clear()
+
+    def enable(self, trace_path=None):
+        """Liga a coleta; o resumo e o trace são gerados ao fim do processo"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.trace_path = trace_path or DEFAULT_TRACE_PATH
+        if multiprocessing.parent_process() is not None:
+            # Processos de decodificação do modo paralelo gravam cada um o seu trace
+            root, extension = os.path.splitext(self.trace_path)
+            self.trace_path = f"{root}.{os.getpid()}{extension}"
+        atexit.register(self.finish)
+
+    def stage(self, name):
+        """Context manager que mede a etapa ``name`` (nulo quando a coleta está desligada)"""
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def record(self, name, start, end):
+        thread = threading.current_thread()
+        self._threads.setdefault(thread.ident, thread.name)
+        self._durations[name].append(end - start)
+        if len(self._events) < MAX_TRACE_EVENTS:
+            self._events.append((name, thread.ident, start, end - start))
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] += amount
+
+    def gauge(self, name, value):
+        """Registra o valor atual de uma medida (ex.: profundidade de fila), guardando o máximo"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if value > self._gauges.get(name, value - 1):
+                self._gauges[name] = value
+        if len(self._events) < MAX_TRACE_EVENTS:
+            self._events.append((name, None, time.perf_counter(), value))
+
+    def summary(self):
+        stages = {}
+        for name, durations in list(self._durations.items()):
+            values = sorted(durations)
+            if not values:
+                continue
+            total = sum(values)
+            stages[name] = {
+                'count': len(values),
+                'total': total,
+                'mean': total / len(values),
+                'p50': _percentile(values, 0.5),
+                'p95': _percentile(values, 0.95),
+                'max': values[-1],
+            }
+        return {
+            'elapsed': time.perf_counter() - self.origin,
+            'stages': stages,
+            'counters': dict(self._counters),
+            'max_gauges': dict(self._gauges),
+            'peak_rss': peak_rss(),
+            'peak_rss_children': peak_rss(children=True),
+        }
+
+    def report(self, file=None):
+        file = file or sys.stderr
+        summary = self.summary()
+        print(f"\n[perfil] {summary['elapsed']:.2f}s, processo {os.getpid()}", file=file)
+        print(f"{'etapa':<18} {'chamadas':>9} {'total s':>9} {'média ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'máx ms':>8}", file=file)
+        for name, stage in sorted(summary['stages'].items(), key=lambda item: -item[1]['total']):
+            print(f"{name:<18} {stage['count']:>9} {stage['total']:>9.3f} {stage['mean'] * 1000:>9.3f} "
+                  f"{stage['p50'] * 1000:>8.3f} {stage['p95'] * 1000:>8.3f} {stage['max'] * 1000:>8.3f}", file=file)
+        for name, value in sorted(summary['counters'].items()):
+            print(f"{name}: {value}", file=file)
+        for name, value in sorted(summary['max_gauges'].items()):
+            print(f"{name} (máximo): {value}", file=file)
+        if summary['peak_rss'] is not None:
+            print(f"pico de memória: {summary['peak_rss'] / (1024 * 1024):.1f} MB", file=file)
+        if summary['peak_rss_children']:
+            print(f"pico de memória dos processos filhos: {summary['peak_rss_children'] / (1024 * 1024):.1f} MB",
+                  file=file)
+
+    def write_trace(self, path):
+        """Grava os eventos no formato Chrome trace (JSON)"""
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in list(self._threads.items())]
+        for name, tid, start, value in list(self._events):
+            timestamp = (start - self.origin) * 1e6
+            if tid is None:
+                events.append({'name': name, 'ph': 'C', 'pid': pid, 'ts': timestamp, 'args': {name: value}})
+            else:
+                events.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid, 'ts': timestamp,
+                               'dur': value * 1e6})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'summary': self.summary()}}, f)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.report()
+        try:
+            self.write_trace(self.trace_path)
+            print(f"[perfil] trace gravado em {self.trace_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"[perfil] não foi possível gravar o trace: {e}", file=sys.stderr)
+
+
+profiler = Profiler()
+
+_env_value = os.environ.get(ENV_VAR, '')
+if _env_value not in ('', '0'):
+    profiler.enable(None if _env_value == '1' else _env_value)
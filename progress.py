@@ -0,0 +1,93 @@
+"""Canal de progresso entre as threads de trabalho e a interface.
+
+As threads de extração não tocam no Tk: publicam o estado mais recente com
+``update`` (estados não lidos são substituídos, então o custo por frame é uma
+atribuição sob lock) ou eventos pontuais com ``post`` (entregues todos, em
+ordem). A interface esvazia o canal em intervalo fixo (UI_REFRESH_MS) com
+``drain``, redesenhando a tela no máximo ~10 vezes por segundo.
+"""
+import collections
+import threading
+import time
+
+# Intervalo de atualização da interface (ms), ~10 Hz
+UI_REFRESH_MS = 100
+# Janela (s) usada no cálculo da vazão recente
+RATE_WINDOW = 2.0
+
+
+class ProgressChannel:
+    """Fila thread-safe de estados (coalescidos por chave) e eventos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._events = collections.deque()
+
+    def update(self, key, value):
+        """Publica o estado atual de ``key``, substituindo o anterior se ainda não foi lido"""
+        with self._lock:
+            self._latest[key] = value
+
+    def post(self, event):
+        """Publica um evento; todos são entregues, na ordem em que chegaram"""
+        with self._lock:
+            self._events.append(event)
+
+    def drain(self):
+        """Retorna (estados publicados desde a última leitura, lista de eventos)"""
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            events = list(self._events)
+            self._events.clear()
+        return latest, events
+
+
+class RateMeter:
+    """Vazão recente (frames/s e bytes/s em uma janela deslizante) e tempo restante estimado"""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self._samples = collections.deque()
+
+    def reset(self):
+        self._samples.clear()
+
+    def add(self, done, bytes_written=0, now=None):
+        now = time.perf_counter() if now is None else now
+        if self._samples and done < self._samples[-1][1]:
+            self._samples.clear()  # Contagem recomeçou (novo lote)
+        self._samples.append((now, done, bytes_written))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+
+    def rates(self):
+        """(frames/s, bytes/s) na janela"""
+        if len(self._samples) < 2:
+            return 0.0, 0.0
+        (start, start_done, start_bytes), (end, end_done, end_bytes) = self._samples[0], self._samples[-1]
+        if end <= start:
+            return 0.0, 0.0
+        return (end_done - start_done) / (end - start), (end_bytes - start_bytes) / (end - start)
+
+    def eta(self, done, total):
+        """Segundos restantes na vazão atual, ou None se não for possível estimar"""
+        rate = self.rates()[0]
+        if rate <= 0 or total <= done:
+            return None
+        return (total - done) / rate
+
+
+def format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} TB"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
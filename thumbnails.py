@@ -0,0 +1,166 @@
+"""Índice de keyframes e miniaturas da linha do tempo.
+
+O índice é montado em segundo plano na primeira abertura de um vídeo e gravado
+ao lado dele (``<vídeo>.thumbs.npz``), ou no cache do usuário (ver cache.py)
+quando a pasta do vídeo não aceita escrita. Aberturas seguintes apenas o
+carregam, enquanto o vídeo não mudar (data de modificação e tamanho).
+
+As miniaturas são tiradas de keyframes (quando o ffprobe informa quais são),
+que se decodificam sem depender de frames anteriores; assim, ao arrastar a
+linha do tempo, a interface mostra na hora a miniatura mais próxima e só
+depois decodifica o frame exato.
+"""
+import bisect
+import os
+
+import cv2
+import numpy as np
+
+import cache
+from extractor import find_keyframes
+
+# Quantidade máxima de miniaturas por vídeo
+THUMBNAIL_COUNT = 120
+# Altura das miniaturas (a largura segue a proporção do vídeo)
+THUMBNAIL_HEIGHT = 72
+THUMBNAIL_SUFFIX = '.thumbs.npz'
+# Incrementar quando o conteúdo do arquivo mudar, invalidando índices antigos
+INDEX_VERSION = 1
+
+
+def sidecar_path(video_path):
+    """Caminho do índice gravado ao lado do vídeo"""
+    return video_path + THUMBNAIL_SUFFIX
+
+
+def nearest_keyframe(keyframes, frame_number):
+    """Keyframe mais próximo de ``frame_number`` (o próprio frame se não há keyframes conhecidos)"""
+    if not keyframes:
+        return frame_number
+    index = bisect.bisect_left(keyframes, frame_number)
+    candidates = keyframes[max(0, index - 1):index + 1]
+    return min(candidates, key=lambda keyframe: abs(keyframe - frame_number))
+
+
+class ThumbnailIndex:
+    """Keyframes e miniaturas (RGB) de um vídeo.
+
+    ``keyframes`` é a lista ordenada de keyframes, ou None se não for
+    conhecida; ``thumbnail_frames[i]`` é o frame mostrado em ``thumbnails[i]``.
+    """
+
+    def __init__(self, fps, frame_count, keyframes, thumbnail_frames, thumbnails):
+        self.fps = fps
+        self.frame_count = frame_count
+        self.keyframes = keyframes
+        self.thumbnail_frames = list(thumbnail_frames)
+        self.thumbnails = thumbnails
+
+    def __len__(self):
+        return len(self.thumbnail_frames)
+
+    def keyframe_before(self, frame_number):
+        """Último keyframe em ou antes de ``frame_number`` (None se desconhecido)"""
+        if not self.keyframes:
+            return None
+        index = bisect.bisect_right(self.keyframes, frame_number)
+        return self.keyframes[index - 1] if index > 0 else None
+
+    def nearest_keyframe(self, frame_number):
+        return nearest_keyframe(self.keyframes, frame_number)
+
+    def nearest_thumbnail(self, frame_number):
+        """Posição da miniatura mais próxima de ``frame_number`` (None se não há miniaturas)"""
+        if not self.thumbnail_frames:
+            return None
+        index = bisect.bisect_left(self.thumbnail_frames, frame_number)
+        candidates = range(max(0, index - 1), min(len(self.thumbnail_frames), index + 1))
+        return min(candidates, key=lambda i: abs(self.thumbnail_frames[i] - frame_number))
+
+    def save(self, path, video_path):
+        info = os.stat(video_path)
+        # Grava em um arquivo temporário e renomeia, para nunca deixar um índice pela metade
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, version=INDEX_VERSION, mtime_ns=info.st_mtime_ns, size=info.st_size,
+                     fps=self.fps, frame_count=self.frame_count,
+                     keyframes=np.asarray(self.keyframes if self.keyframes is not None else [], dtype=np.int64),
+                     has_keyframes=self.keyframes is not None,
+                     thumbnail_frames=np.asarray(self.thumbnail_frames, dtype=np.int64),
+                     thumbnails=self.thumbnails)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, video_path):
+        """Carrega o índice de ``path``; retorna None se não existir ou estiver desatualizado"""
+        try:
+            info = os.stat(video_path)
+            with np.load(path) as data:
+                if (int(data['version']) != INDEX_VERSION or int(data['mtime_ns']) != info.st_mtime_ns
+                        or int(data['size']) != info.st_size):
+                    return None
+                keyframes = data['keyframes'].tolist() if bool(data['has_keyframes']) else None
+                return cls(float(data['fps']), int(data['frame_count']), keyframes,
+                           data['thumbnail_frames'].tolist(), data['thumbnails'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def thumbnail_targets(frame_count, keyframes, count=THUMBNAIL_COUNT):
+    """Frames a miniaturizar: até ``count`` posições espaçadas, movidas para o keyframe mais próximo"""
+    if frame_count <= 0:
+        return []
+    count = max(1, min(count, frame_count))
+    targets = [frame_count * i // count for i in range(count)]
+    if keyframes:
+        targets = [nearest_keyframe(keyframes, target) for target in targets]
+    return sorted(set(targets))
+
+
+def build_index(video_path, info, stop_event=None):
+    """Decodifica as miniaturas do vídeo (``info`` é o probe.VideoInfo); None se interrompido"""
+    keyframes = find_keyframes(video_path)
+    height = THUMBNAIL_HEIGHT
+    width = max(1, round(info.width * height / info.height)) if info.height else height
+    frames = []
+    thumbnails = []
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise IOError(f"Não foi possível abrir o vídeo: {video_path}")
+        position = 0
+        for frame_number in thumbnail_targets(info.frame_count, keyframes):
+            if stop_event is not None and stop_event.is_set():
+                return None
+            if frame_number != position:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position = frame_number + 1
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            thumbnails.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            frames.append(frame_number)
+    finally:
+        cap.release()
+    array = np.stack(thumbnails) if thumbnails else np.zeros((0, height, width, 3), np.uint8)
+    return ThumbnailIndex(info.fps, info.frame_count, keyframes, frames, array)
+
+
+def load_or_build_index(video_path, info, stop_event=None):
+    """Índice do vídeo: carregado do disco se existir e estiver atualizado, senão montado e gravado"""
+    paths = [sidecar_path(video_path), cache.cache_path('thumbs', video_path, THUMBNAIL_SUFFIX, INDEX_VERSION)]
+    for path in paths:
+        index = ThumbnailIndex.load(path, video_path)
+        if index is not None:
+            return index
+    index = build_index(video_path, info, stop_event)
+    if index is None:
+        return None
+    for path in paths:
+        try:
+            index.save(path, video_path)
+            break
+        except OSError:
+            pass  # Pasta do vídeo somente leitura: tenta o cache do usuário
+    return index
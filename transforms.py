@@ -0,0 +1,162 @@
+"""Pós-processamento dos frames extraídos: recorte, redimensionamento e conversão de cor.
+
+    python extractor.py video.mp4 -o /saida --format npy --size 512x512 --color rgb
+    python extractor.py video.mp4 -o /saida --crop 0,140,1920,800 --size 640x640 --resize-mode fit --color gray
+
+Aplicado pelas threads de gravação antes da codificação, em lotes de até
+``batch_size`` frames: os frames de um lote são redimensionados para um único
+array (N, altura, largura, canais) e a conversão de cor é feita nele de uma
+vez só. As etapas seguem a ordem recorte -> redimensionamento -> cor, de modo
+que a conversão já trabalha na resolução final.
+
+O redimensionamento usa a mesma geometria do preview (playback.letterbox_geometry):
+
+- ``letterbox``: mantém a proporção e centraliza em fundo preto do tamanho pedido;
+- ``fit``: mantém a proporção, sem bordas (o frame cabe no tamanho pedido);
+- ``stretch``: ocupa exatamente o tamanho pedido, sem manter a proporção.
+
+Conversões além de ``gray`` gravam os canais na nova ordem/espaço de cor; em
+PNG/JPEG/TIFF a imagem continua sendo lida como BGR pelos visualizadores, então
+são mais úteis com ``--format npy`` ou ``--container``.
+"""
+import cv2
+import numpy as np
+
+from playback import letterbox_geometry
+
+RESIZE_MODES = ('letterbox', 'fit', 'stretch')
+# Conversões a partir do BGR decodificado: nome -> (código do cv2, canais do resultado)
+COLOR_CONVERSIONS = {
+    'gray': (cv2.COLOR_BGR2GRAY, 1),
+    'rgb': (cv2.COLOR_BGR2RGB, 3),
+    'hsv': (cv2.COLOR_BGR2HSV, 3),
+    'lab': (cv2.COLOR_BGR2LAB, 3),
+    'ycrcb': (cv2.COLOR_BGR2YCrCb, 3),
+    'yuv': (cv2.COLOR_BGR2YUV, 3),
+}
+DEFAULT_TRANSFORM_BATCH = 8
+
+
+def parse_size(value):
+    """Converte 'LARGURAxALTURA' em (largura, altura)"""
+    width, _, height = value.lower().partition('x')
+    try:
+        size = int(width), int(height)
+    except ValueError:
+        raise ValueError(f"Tamanho inválido (use LARGURAxALTURA): {value}") from None
+    if min(size) < 1:
+        raise ValueError(f"Tamanho inválido: {value}")
+    return size
+
+
+def parse_crop(value):
+    """Converte 'X,Y,LARGURA,ALTURA' em uma tupla de inteiros"""
+    try:
+        x, y, width, height = (int(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError(f"Recorte inválido (use X,Y,LARGURA,ALTURA): {value}") from None
+    if x < 0 or y < 0 or width < 1 or height < 1:
+        raise ValueError(f"Recorte inválido: {value}")
+    return x, y, width, height
+
+
+class FrameTransform:
+    """Recorte, redimensionamento e conversão de cor aplicados aos frames BGR decodificados.
+
+    ``crop`` é (x, y, largura, altura) em pixels do vídeo; ``size`` é
+    (largura, altura) do resultado; ``color`` é uma chave de COLOR_CONVERSIONS
+    ou None para manter BGR.
+    """
+
+    def __init__(self, size=None, resize_mode='letterbox', crop=None, color=None,
+                 interpolation=None, batch_size=DEFAULT_TRANSFORM_BATCH):
+        if resize_mode not in RESIZE_MODES:
+            raise ValueError(f"Modo de redimensionamento desconhecido: {resize_mode}")
+        if color is not None and color not in COLOR_CONVERSIONS:
+            raise ValueError(f"Conversão de cor desconhecida: {color}")
+        self.size = tuple(size) if size is not None else None
+        self.resize_mode = resize_mode
+        self.crop = tuple(crop) if crop is not None else None
+        self.color = color
+        # None: INTER_AREA ao reduzir (melhor qualidade) e INTER_LINEAR ao ampliar
+        self.interpolation = interpolation
+        self.batch_size = max(1, int(batch_size))
+
+    def __repr__(self):
+        return (f"FrameTransform(size={self.size}, resize_mode={self.resize_mode!r}, crop={self.crop}, "
+                f"color={self.color!r})")
+
+    def _crop_box(self, width, height):
+        if self.crop is None:
+            return 0, 0, width, height
+        x, y, crop_width, crop_height = self.crop
+        if x >= width or y >= height:
+            raise ValueError(f"Recorte {self.crop} fora do frame {width}x{height}")
+        return x, y, min(crop_width, width - x), min(crop_height, height - y)
+
+    def _geometry(self, width, height):
+        """(largura e altura da saída, x, y, largura, altura da imagem dentro dela)"""
+        if self.size is None:
+            return width, height, 0, 0, width, height
+        out_width, out_height = self.size
+        if self.resize_mode == 'stretch':
+            return out_width, out_height, 0, 0, out_width, out_height
+        x, y, fit_width, fit_height = letterbox_geometry(width, height, out_width, out_height)
+        if self.resize_mode == 'fit':
+            return fit_width, fit_height, 0, 0, fit_width, fit_height
+        return out_width, out_height, x, y, fit_width, fit_height
+
+    def output_shape(self, frame_shape):
+        """Formato (altura, largura[, canais]) dos frames transformados"""
+        height, width = frame_shape[:2]
+        _, _, crop_width, crop_height = self._crop_box(width, height)
+        out_width, out_height = self._geometry(crop_width, crop_height)[:2]
+        channels = COLOR_CONVERSIONS[self.color][1] if self.color is not None else 3
+        return (out_height, out_width) if channels == 1 else (out_height, out_width, channels)
+
+    def apply(self, frame):
+        return self.apply_batch([frame])[0]
+
+    def apply_batch(self, frames):
+        """Transforma uma lista de frames do mesmo tamanho; retorna um array (N, ...)"""
+        height, width = frames[0].shape[:2]
+        x, y, crop_width, crop_height = self._crop_box(width, height)
+        out_width, out_height, x_offset, y_offset, fit_width, fit_height = self._geometry(crop_width, crop_height)
+        resized = (fit_width, fit_height) != (crop_width, crop_height)
+        # Letterbox de um frame que já cabe no tamanho pedido: não redimensiona, mas ganha bordas
+        padded = (out_width, out_height) != (fit_width, fit_height)
+        if not resized and not padded and self.color is None and self.crop is None:
+            return np.stack(frames)
+        interpolation = self.interpolation
+        if interpolation is None:
+            interpolation = cv2.INTER_AREA if fit_width < crop_width else cv2.INTER_LINEAR
+        batch = (np.zeros if padded else np.empty)((len(frames), out_height, out_width, 3), dtype=np.uint8)
+        for frame, target in zip(frames, batch):
+            # O recorte é uma view; o resultado vai direto para a posição do frame no lote
+            source = frame[y:y + crop_height, x:x + crop_width]
+            target = target[y_offset:y_offset + fit_height, x_offset:x_offset + fit_width]
+            if resized:
+                cv2.resize(source, (fit_width, fit_height), dst=target, interpolation=interpolation)
+            else:
+                target[...] = source
+        if self.color is None:
+            return batch
+        code, channels = COLOR_CONVERSIONS[self.color]
+        # Uma única conversão para o lote inteiro, visto como uma imagem de N * altura linhas
+        converted = cv2.cvtColor(batch.reshape(-1, out_width, 3), code)
+        shape = (len(frames), out_height, out_width) + ((channels,) if channels > 1 else ())
+        return converted.reshape(shape)
+
+
+def transform_from_options(options):
+    """Retira de ``options`` (argumentos da linha de comando) as opções de transformação.
+
+    Retorna um FrameTransform, ou None se nenhuma transformação foi pedida.
+    """
+    size = options.pop('size', None)
+    resize_mode = options.pop('resize_mode', 'letterbox')
+    crop = options.pop('crop', None)
+    color = options.pop('color', None)
+    if size is None and crop is None and color is None:
+        return None
+    return FrameTransform(size, resize_mode, crop, color)
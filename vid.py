@@ -1,23 +1,63 @@
+import time
+
+# Referência dos tempos de inicialização (--startup-time)
+STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
-import cv2
+import argparse
+import importlib
+import json
 import threading
-import os
 import concurrent.futures
-import pygame
-import time
-import tempfile
+import os
 import shutil
-import numpy as np
+import sys
+
+# Apenas módulos leves aqui: OpenCV, NumPy, pygame e os módulos que dependem deles
+# são carregados em segundo plano depois que a janela aparece (ver DEFERRED_MODULES)
+from progress import UI_REFRESH_MS, ProgressChannel, RateMeter, format_bytes, format_duration
+from profiling import profiler
+
+# Intervalo com que o thread do Tk verifica tarefas em segundo plano (ms)
+BACKGROUND_POLL_MS = 50
+# Espera entre movimentos do arraste na linha do tempo antes de decodificar o keyframe (ms)
+SCRUB_SEEK_DELAY_MS = 60
+# Intervalo da espera pelo frame de um seek com o preview pausado (ms)
+SEEK_POLL_MS = 10
+# Altura da linha do tempo: a de thumbnails.THUMBNAIL_HEIGHT, repetida aqui para que a
+# janela seja montada sem esperar o OpenCV (importado por thumbnails.py)
+TIMELINE_HEIGHT = 72
+# Importados em segundo plano assim que a janela aparece; os métodos que os usam os
+# importam localmente (sem custo se já carregados, ou aguardando a carga em andamento)
+DEFERRED_MODULES = ('numpy', 'cv2', 'probe', 'playback', 'thumbnails', 'jobs')
+
+
+def run_in_background(function, *args):
+    """Executa ``function`` em uma thread daemon e retorna um Future com o resultado"""
+    future = concurrent.futures.Future()
+
+    def run():
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def preload_modules(names=DEFERRED_MODULES):
+    for name in names:
+        importlib.import_module(name)
+
+
+def init_audio():
+    """Importa o pygame e inicializa apenas o mixer (os demais subsistemas não são usados)"""
+    import pygame
+    pygame.mixer.init()
+    return importlib.import_module('audio')
 
-# Remove the first import of moviepy and keep only the try-except block
-try:
-    from moviepy.editor import VideoFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
-    print("Warning: moviepy not available. Audio preview will be disabled.")
 
 class VideoPlayerApp:
     def __init__(self, root):
@@ -29,11 +69,20 @@ class VideoPlayerApp:
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
         
-        # Inicializa pygame para áudio
-        pygame.init()
-        pygame.mixer.init()
-        
+        # Módulos pesados e áudio carregados em segundo plano quando a janela aparece
+        self.modules_future = None
+        self.audio_future = None
+        self.window_shown = None
+        self.loaded_at = {}  # Instante em que cada carga em segundo plano terminou
+        self.root.bind('<Map>', self._on_window_shown)
+
         self.video_path = None
+        self.video_info = None  # probe.VideoInfo do vídeo selecionado
+        self.open_future = None  # Abertura em andamento (consulta de metadados)
+        self.thumbnail_index = None  # thumbnails.ThumbnailIndex do vídeo, montado em segundo plano
+        self.index_future = None
+        self.index_stop = threading.Event()
+        self.timeline_photo = None
         self.cap = None
         self.playing = False
         self.cap_lock = threading.Lock()
@@ -42,13 +91,71 @@ class VideoPlayerApp:
         # Add a new variable for video progress
         self.video_progress_var = tk.DoubleVar()
         self.preview_playing = False
-        self.preview_thread = None
-        self.temp_audio_file = None
+        self.total_preview_frames = 0
 
-        self.preview_cap = None  # VideoCapture dedicado para o preview
+        self.preview_reader = None  # Thread de decodificação dedicada ao preview
         self.preview_lock = threading.Lock()  # Lock específico para o preview
+        # Relógio do preview (criado no primeiro preview): segue o áudio quando há trilha, senão o relógio de parede
+        self.preview_clock = None
+        self.sync_label_updated = 0.0
+        self.preview_job = None  # Próxima apresentação agendada com root.after
+        self.preview_audio = None  # AudioStream da trilha do vídeo em preview
+        self.preview_loop = 0  # Trecho em apresentação (muda a cada volta do loop ou seek)
+        self.preview_min_loop = 0  # Frames de trechos anteriores ao último seek são ignorados
+        self.scrub_job = None  # Seek para o keyframe agendado durante o arraste da linha do tempo
+        self.scrub_resume = False  # Retomar a reprodução ao soltar a linha do tempo
+        self.seek_job = None  # Espera do frame de um seek com o preview pausado
+        self.preview_dropped_frames = 0
+        self.preview_current = None  # Frame em exibição (seu canvas volta ao pool quando substituído)
+        self.preview_photo = None  # PhotoImage persistente, atualizado com paste()
+
+        # Threads de trabalho publicam progresso aqui; o thread do Tk o aplica a ~10 Hz
+        self.progress_channel = ProgressChannel()
+        self.extraction_rate = RateMeter()
+        self.playback_progress = None  # (frame atual, total) ainda não aplicado à barra do preview
+        self._extraction_queue = None
+        self.copy_video_jobs = set()  # Extrações do vídeo atual: perguntar se o vídeo deve ser copiado
         
         self.create_widgets()
+        self._refresh_ui()
+
+    def _on_window_shown(self, event):
+        if event.widget is not self.root or self.window_shown is not None:
+            return
+        self.window_shown = time.perf_counter()
+        self._start_background_loading()
+
+    def _start_background_loading(self):
+        if self.modules_future is not None:
+            return
+        self.modules_future = run_in_background(preload_modules)
+        self.audio_future = run_in_background(init_audio)
+        for name, future in (('modules', self.modules_future), ('audio', self.audio_future)):
+            future.add_done_callback(lambda _, name=name: self.loaded_at.setdefault(name, time.perf_counter()))
+
+    @property
+    def extraction_queue(self):
+        """Fila de extrações (do vídeo atual ou de pastas inteiras) com limite global, criada no primeiro uso"""
+        if self._extraction_queue is None:
+            from jobs import ExtractionQueue
+            self._extraction_queue = ExtractionQueue(progress_callback=self._on_extraction_progress,
+                                                     job_callback=self._on_extraction_job_done)
+        return self._extraction_queue
+
+    def report_startup(self):
+        """--startup-time: imprime (JSON) os tempos de inicialização em ms e fecha o aplicativo"""
+        if self.window_shown is None or len(self.loaded_at) < 2:
+            self.root.after(BACKGROUND_POLL_MS, self.report_startup)
+            return
+        audio_error = self.audio_future.exception()
+        print(json.dumps({
+            'window_ms': (self.window_shown - STARTED) * 1000,
+            'modules_ms': (self.loaded_at['modules'] - STARTED) * 1000,
+            'audio_ms': (self.loaded_at['audio'] - STARTED) * 1000,
+            'ready_ms': (max(self.loaded_at.values()) - STARTED) * 1000,
+            'audio_error': str(audio_error) if audio_error is not None else None,
+        }), flush=True)
+        self.quit_app()
 
     def create_widgets(self):
         # Criando frame principal que se adaptará ao redimensionamento
@@ -87,8 +194,11 @@ class VideoPlayerApp:
         self.extract_btn.grid(row=0, column=6, padx=5)
         self.extract_btn['state'] = 'disabled'
 
+        self.extract_folder_btn = tk.Button(button_frame, text="EXTRAIR PASTA", command=self.extract_folder)
+        self.extract_folder_btn.grid(row=0, column=7, padx=5)
+
         self.quit_btn = tk.Button(button_frame, text="SAIR", command=self.quit_app)
-        self.quit_btn.grid(row=0, column=7, padx=5)
+        self.quit_btn.grid(row=0, column=8, padx=5)
 
         # Frame central para preview com altura fixa
         preview_container = tk.Frame(main_frame, height=600)  # Fixed height
@@ -98,9 +208,21 @@ class VideoPlayerApp:
         # Preview label dentro do container
         self.preview_label = tk.Label(preview_container)
         self.preview_label.pack(expand=True, fill='both')
+        # Linha do tempo com miniaturas; clicar ou arrastar nela (ou na barra) posiciona o preview
+        self.timeline_canvas = tk.Canvas(preview_container, height=TIMELINE_HEIGHT, background='black',
+                                         highlightthickness=0)
+        self.timeline_canvas.pack(fill='x')
+        self.timeline_canvas.bind('<Configure>', lambda event: self._draw_timeline())
         # Add the video progress bar below the preview label
         self.video_progress_bar = ttk.Progressbar(preview_container, variable=self.video_progress_var, maximum=100, style="red.Horizontal.TProgressbar")
         self.video_progress_bar.pack(fill='x', pady=(0, 2))
+        for widget in (self.timeline_canvas, self.video_progress_bar):
+            widget.bind('<Button-1>', self._on_timeline_press)
+            widget.bind('<B1-Motion>', self._on_timeline_drag)
+            widget.bind('<ButtonRelease-1>', self._on_timeline_release)
+        # Sincronia A/V medida durante o preview
+        self.sync_label = tk.Label(preview_container, text="", anchor='e')
+        self.sync_label.pack(fill='x')
 
         # Frame inferior para controles de extração
         bottom_frame = tk.Frame(main_frame)
@@ -114,27 +236,28 @@ class VideoPlayerApp:
         self.progress_label = tk.Label(self.progress_frame, text="")
         self.progress_label.pack()
 
-    def _extract_audio(self):
-        """Extrai áudio do vídeo para arquivo temporário"""
-        if not MOVIEPY_AVAILABLE:
-            print("Audio extraction not available - moviepy module not found")
+    def _open_preview_audio(self):
+        """Prepara o streaming do áudio do vídeo (decodificado em segundo plano e mantido em cache)"""
+        self._start_background_loading()
+        try:
+            # Normalmente já carregado: a inicialização começa quando a janela aparece
+            audio = self.audio_future.result()
+        except Exception as e:
+            print(f"Aviso: áudio indisponível ({e}); o preview será exibido sem áudio.")
             return None
-            
         try:
-            if self.temp_audio_file:
-                pygame.mixer.music.unload()
-                os.remove(self.temp_audio_file)
-                
-            video = VideoFileClip(self.video_path)
-            if video.audio is not None:
-                temp = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                self.temp_audio_file = temp.name
-                video.audio.write_audiofile(self.temp_audio_file, verbose=False, logger=None)
-                video.close()
-                return self.temp_audio_file
+            decoded = audio.open_audio(self.video_path)
         except Exception as e:
-            print(f"Erro ao extrair áudio: {e}")
-        return None
+            print(f"Erro ao abrir o áudio: {e}")
+            return None
+        if decoded is None:
+            print("Aviso: ffmpeg não encontrado; o preview será exibido sem áudio.")
+            return None
+        return audio.AudioStream(decoded)
+
+    def _stop_preview_audio(self):
+        if self.preview_audio is not None:
+            self.preview_audio.stop()
 
     def _update_button_states(self, state='normal'):
         """Atualiza o estado de todos os botões que dependem da seleção do vídeo"""
@@ -146,193 +269,331 @@ class VideoPlayerApp:
         self.extract_btn['state'] = state
     
     def select_video(self):
-        self.video_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4;*.avi;*.mov;*.mkv;*.wmv;*.gif")])
-        if self.video_path:
-            self.cap = cv2.VideoCapture(self.video_path)
-            if not self.cap.isOpened():
-                messagebox.showerror("Erro", "Não foi possível abrir o vídeo selecionado!")
-                self._update_button_states('disabled')  # Desativa botões se falhar
-                return
-            self._update_button_states('normal')  # Ativa botões se sucesso
-            # --- NEW CODE BELOW ---
-            import os
-            # Path, name, extension
-            video_full_path = self.video_path
-            # File size in MB
-            file_size = os.path.getsize(self.video_path) / (1024 * 1024)
-            # Frame count
-            frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            # Dimensions
-            width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            # Duration in seconds
-            fps = self.cap.get(cv2.CAP_PROP_FPS)
-            duration = frame_count / fps if fps > 0 else 0
-            # Format duration as mm:ss
-            mins = int(duration // 60)
-            secs = int(duration % 60)
-            duration_str = f"{mins:02d}:{secs:02d}"
-            # Set window title
-            self.root.title(f"Video Player | {video_full_path} | {file_size:.2f} MB | {width}x{height} | {duration_str} | {frame_count} frames")
-            
-            # Initialize total_frames for playback progress
-            self.total_preview_frames = int(self.preview_cap.get(cv2.CAP_PROP_FRAME_COUNT)) if self.preview_cap else 0
-            self.show_preview()
-        else:
+        video_path = filedialog.askopenfilename(filetypes=[("Video files", "*.mp4;*.avi;*.mov;*.mkv;*.wmv;*.gif")])
+        if not video_path:
             self._update_button_states('disabled')  # Desativa botões se nenhum arquivo selecionado
-    
+            return
+        self.stop_preview()
+        self.index_stop.set()  # Interrompe o índice de miniaturas do vídeo anterior
+        self.thumbnail_index = None
+        self._draw_timeline()
+        self.video_path = video_path
+        self.video_info = None
+        self._update_button_states('disabled')
+        self.root.title(f"Video Player | Abrindo {video_path}...")
+        # Metadados consultados fora do thread do Tk (e em cache nas próximas aberturas);
+        # os decodificadores só são abertos quando o preview ou a extração precisarem
+        from probe import probe_video
+        self.open_future = run_in_background(probe_video, video_path)
+        self._after_background(self.open_future, self._on_video_opened)
+
+    def _after_background(self, future, callback):
+        """Chama ``callback(future)`` no thread do Tk quando a tarefa em segundo plano terminar"""
+        if future.done():
+            callback(future)
+        else:
+            self.root.after(BACKGROUND_POLL_MS, self._after_background, future, callback)
+
+    def _on_video_opened(self, future):
+        if future is not self.open_future:
+            return  # Outro vídeo foi selecionado enquanto este abria
+        self.open_future = None
+        try:
+            info = future.result()
+        except Exception:
+            self.root.title("Video Player")
+            messagebox.showerror("Erro", "Não foi possível abrir o vídeo selecionado!")
+            self._update_button_states('disabled')  # Desativa botões se falhar
+            return
+        self.video_info = info
+        self._update_button_states('normal')  # Ativa botões se sucesso
+        # Format duration as mm:ss
+        mins = int(info.duration // 60)
+        secs = int(info.duration % 60)
+        duration_str = f"{mins:02d}:{secs:02d}"
+        # Set window title
+        self.root.title(f"Video Player | {info.path} | {info.file_size / (1024 * 1024):.2f} MB | "
+                        f"{info.width}x{info.height} | {duration_str} | {info.frame_count} frames")
+
+        # Initialize total_frames for playback progress
+        self.total_preview_frames = info.frame_count
+        self.show_preview()
+
+        # Keyframes e miniaturas da linha do tempo (lidos do disco se já foram gerados antes)
+        from thumbnails import load_or_build_index
+        self.index_stop = threading.Event()
+        self.index_future = run_in_background(load_or_build_index, info.path, info, self.index_stop)
+        self._after_background(self.index_future, self._on_thumbnail_index)
+
+    def _on_thumbnail_index(self, future):
+        if future is not self.index_future:
+            return
+        self.index_future = None
+        try:
+            self.thumbnail_index = future.result()
+        except Exception as e:
+            print(f"Erro ao gerar as miniaturas da linha do tempo: {e}")
+            return
+        self._draw_timeline()
+
+    def _draw_timeline(self):
+        """Desenha a faixa de miniaturas na largura atual da linha do tempo"""
+        canvas = self.timeline_canvas
+        canvas.delete('all')
+        width = canvas.winfo_width()
+        index = self.thumbnail_index
+        if index is not None and len(index) and width > 1 and index.frame_count > 0:
+            import numpy as np
+            thumb_height, thumb_width = index.thumbnails.shape[1:3]
+            # Cada posição da faixa mostra a miniatura mais próxima do seu instante
+            slots = -(-width // thumb_width)
+            strip = np.empty((thumb_height, slots * thumb_width, 3), dtype=np.uint8)
+            for slot in range(slots):
+                center = slot * thumb_width + thumb_width // 2
+                thumbnail = index.nearest_thumbnail(index.frame_count * center // width)
+                strip[:, slot * thumb_width:(slot + 1) * thumb_width] = index.thumbnails[thumbnail]
+            self.timeline_photo = ImageTk.PhotoImage(Image.fromarray(strip[:, :width]))
+            canvas.create_image(0, 0, image=self.timeline_photo, anchor='nw')
+        canvas.create_line(0, 0, 0, TIMELINE_HEIGHT, fill='red', width=2, tags='playhead')
+        self._move_playhead(self.video_progress_var.get() / 100)
+
+    def _move_playhead(self, fraction):
+        x = fraction * self.timeline_canvas.winfo_width()
+        self.timeline_canvas.coords('playhead', x, 0, x, TIMELINE_HEIGHT)
+
+    def _timeline_frame(self, event):
+        """Frame correspondente à posição do mouse na linha do tempo"""
+        fraction = min(max(event.x / max(1, event.widget.winfo_width()), 0.0), 1.0)
+        return min(int(fraction * self.total_preview_frames), max(0, self.total_preview_frames - 1))
+
+    def _on_timeline_press(self, event):
+        if self.preview_reader is None:
+            return
+        self.scrub_resume = self.preview_playing
+        if self.preview_playing:
+            self.pause_video()
+        self._on_timeline_drag(event)
+
+    def _on_timeline_drag(self, event):
+        if self.preview_reader is None:
+            return
+        frame_number = self._timeline_frame(event)
+        self._update_playback_progress(frame_number + 1, self.total_preview_frames)
+        self._apply_playback_progress()  # Arrastando: a barra acompanha o mouse sem esperar a atualização periódica
+        index = self.thumbnail_index
+        target = frame_number
+        if index is not None and len(index):
+            # Resposta imediata: a miniatura mais próxima, sem decodificar nada
+            self._show_thumbnail(index.thumbnails[index.nearest_thumbnail(frame_number)])
+            target = index.nearest_keyframe(frame_number)
+        # Depois o keyframe mais próximo (decodificação barata), agrupando movimentos rápidos
+        if self.scrub_job is not None:
+            self.root.after_cancel(self.scrub_job)
+        self.scrub_job = self.root.after(SCRUB_SEEK_DELAY_MS, self._seek_preview, target)
+
+    def _on_timeline_release(self, event):
+        if self.preview_reader is None:
+            return
+        if self.scrub_job is not None:
+            self.root.after_cancel(self.scrub_job)
+            self.scrub_job = None
+        # Refina para o frame exato
+        self._seek_preview(self._timeline_frame(event))
+        if self.scrub_resume:
+            self.scrub_resume = False
+            self.resume_video()
+
+    def _seek_preview(self, frame_number):
+        self.scrub_job = None
+        reader = self.preview_reader
+        if reader is None:
+            return
+        index = self.thumbnail_index
+        keyframe = index.keyframe_before(frame_number) if index is not None else None
+        self.preview_min_loop = reader.seek(frame_number, keyframe)
+        self.preview_loop = None  # O primeiro frame do seek reinicia áudio e relógio
+        self._stop_preview_audio()
+        if not self.preview_playing:
+            if self.seek_job is not None:
+                self.root.after_cancel(self.seek_job)
+            self._show_seek_frame()
+
+    def _show_seek_frame(self):
+        """Com o preview pausado, exibe o frame do seek assim que ele for decodificado"""
+        self.seek_job = None
+        reader = self.preview_reader
+        if reader is None or self.preview_playing:
+            return
+        reader.buffer.discard_before(self.preview_min_loop)
+        item = reader.buffer.pop()
+        if item is not None:
+            self._display_preview_item(reader, item)
+        elif not reader.finished.is_set():
+            self.seek_job = self.root.after(SEEK_POLL_MS, self._show_seek_frame)
+
+    def _show_thumbnail(self, thumbnail):
+        width, height = self._preview_size()
+        if width <= 1 or height <= 1:
+            return
+        import cv2
+        from playback import fit_frame
+        frame = fit_frame(cv2.cvtColor(thumbnail, cv2.COLOR_RGB2RGBA), width, height)
+        self._show_preview_image(Image.frombuffer('RGBA', (width, height), frame, 'raw', 'RGBA', 0, 1))
+
     def show_preview(self):
-        if not self.video_path:
+        if not self.video_path or self.video_info is None:
             return
 
         # Para preview anterior se existir
         self.stop_preview()
+        from playback import AVSyncClock, DecodeAheadReader
+        if self.preview_clock is None:
+            self.preview_clock = AVSyncClock(self._audio_position)
+
+        # Decodificação, conversão e redimensionamento rodam na thread do DecodeAheadReader;
+        # o thread do Tk apenas apresenta os frames prontos. O vídeo é aberto pela própria thread
+        reader = DecodeAheadReader(self.video_path, info=self.video_info)
+        self.total_preview_frames = reader.total_frames
+        reader.target_size = self._preview_size()
+
+        # Áudio em streaming: começa a tocar assim que o primeiro bloco é decodificado
+        self.preview_audio = self._open_preview_audio()
 
-        # Cria um VideoCapture dedicado para o preview
         with self.preview_lock:
-            self.preview_cap = cv2.VideoCapture(self.video_path)
-            if not self.preview_cap.isOpened():
-                messagebox.showwarning("Aviso", "Não foi possível abrir o vídeo para preview!")
-                self.preview_cap = None
-                return
-            # Set total_preview_frames here as well, in case select_video didn't set it
-            self.total_preview_frames = int(self.preview_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.preview_reader = reader
+        self.preview_playing = True
+        self.preview_loop = 0
+        self.preview_min_loop = 0
+        self.preview_dropped_frames = 0
+        self.play_btn['state'] = 'disabled'
+        reader.start()
 
-        # Extrai áudio
-        audio_path = self._extract_audio()
-        
-        # Obtém FPS do vídeo
-        fps = self.preview_cap.get(cv2.CAP_PROP_FPS)
-        delay = 1.0 / fps if fps > 0 else 0.033  # 30 FPS default
-        
-        def update_preview():
-            try:
-                with self.preview_lock:
-                    if self.preview_cap is None or not self.preview_playing:
-                        # Stop audio if it's playing and preview is stopping
-                        if pygame.mixer.music.get_busy():
-                            pygame.mixer.music.stop()
-                        # Reset progress bar when preview stops
-                        self.root.after(0, lambda: self._update_playback_progress(0, self.total_preview_frames))
-                        return # Stop scheduling if preview is not playing or cap is released
-
-                    ret, frame = self.preview_cap.read()
-                    current_frame_pos = int(self.preview_cap.get(cv2.CAP_PROP_POS_FRAMES))
-                    
-                if not ret:
-                    # Loop video and audio if end is reached
-                    with self.preview_lock:
-                        if self.preview_cap is not None:
-                            self.preview_cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                            if audio_path:
-                                pygame.mixer.music.play()
-                    # Schedule the next frame after looping
-                    self.root.after(int(delay * 1000), update_preview)
-                    return
-                    
-                # Processa frame mantendo aspect ratio corretamente
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img_height, img_width = frame.shape[:2]
-                aspect_ratio = img_width / img_height
-                
-                # Obtém dimensões disponíveis
-                window_width = self.preview_label.winfo_width()
-                window_height = self.preview_label.winfo_height()
-                
-                if window_width > 1 and window_height > 1:
-                    # Calcula novas dimensões que cabem na janela mantendo a proporção
-                    if window_width / window_height > aspect_ratio:
-                        # Limita pela altura
-                        new_height = window_height
-                        new_width = int(new_height * aspect_ratio)
-                    else:
-                        # Limita pela largura
-                        new_width = window_width
-                        new_height = int(new_width / aspect_ratio)
-                    
-                    # Redimensiona mantendo a proporção original
-                    frame = cv2.resize(frame, (new_width, new_height))
-                    
-                    # Cria uma imagem preta do tamanho da janela
-                    bg = np.zeros((window_height, window_width, 3), dtype=np.uint8)
-                    
-                    # Centraliza a imagem redimensionada
-                    x_offset = (window_width - new_width) // 2
-                    y_offset = (window_height - new_height) // 2
-                    bg[y_offset:y_offset+new_height, x_offset:x_offset+new_width] = frame
-                    frame = bg
-                
-                # Atualiza preview
-                image = Image.fromarray(frame)
-                photo = ImageTk.PhotoImage(image)
+        try:
+            # Inicia áudio se disponível
+            if self.preview_audio is not None:
+                self.preview_audio.play()
+        except Exception as e:
+            print(f"Erro ao iniciar o áudio do preview: {e}")
+        self.preview_clock.start()
+        self._present_preview_frame()
+
+    def _audio_position(self):
+        """Segundos de áudio tocados desde o último play, ou None se não há áudio tocando"""
+        audio = self.preview_audio
+        return audio.position() if audio is not None else None
+
+    def _update_sync_label(self, reader):
+        # Atualiza no máximo duas vezes por segundo
+        now = time.monotonic()
+        if now - self.sync_label_updated < 0.5:
+            return
+        self.sync_label_updated = now
+        clock = self.preview_clock
+        self.sync_label.config(text=f"Sincronia A/V: {clock.drift * 1000:+.0f} ms "
+                                    f"(máx. {clock.max_drift * 1000:.0f} ms) | "
+                                    f"frames descartados: {self.preview_dropped_frames + reader.skipped_frames}")
+
+    def _show_preview_canvas(self, canvas):
+        if canvas.image is None:
+            # Imagem PIL que compartilha a memória do canvas (sem cópia)
+            canvas.image = Image.frombuffer('RGBA', canvas.size, canvas.array, 'raw', 'RGBA', 0, 1)
+        self._show_preview_image(canvas.image)
+
+    def _show_preview_image(self, image):
+        """Copia a imagem para o PhotoImage persistente, recriado só quando o tamanho muda"""
+        with profiler.stage('photoimage'):
+            photo = self.preview_photo
+            if photo is None or (photo.width(), photo.height()) != image.size:
+                photo = self.preview_photo = ImageTk.PhotoImage('RGBA', image.size)
                 self.preview_label.config(image=photo)
                 self.preview_label.image = photo
-                
-                # Update playback progress bar
-                self.root.after(0, lambda: self._update_playback_progress(current_frame_pos, self.total_preview_frames))
-
-                # Schedule the next frame update
-                self.root.after(int(delay * 1000), update_preview)
-            except Exception as e:
-                print(f"Erro no preview: {e}")
-                self.preview_playing = False # Ensure preview stops on error
-                # Stop audio on error
-                if pygame.mixer.music.get_busy():
-                    pygame.mixer.music.stop()
-                # Reset progress bar on error
-                self.root.after(0, lambda: self._update_playback_progress(0, self.total_preview_frames))
-            finally:
-                pass
-        
-        # Inicia preview em thread separada (this thread will only start the first frame update)
-        # The subsequent updates are scheduled by self.root.after
-        def start_preview_thread():
-            try:
-                self.preview_playing = True
-                self.play_btn['state'] = 'disabled'
-                
-                # Inicia áudio se disponível
-                if audio_path:
-                    pygame.mixer.music.load(audio_path)
-                    pygame.mixer.music.play()
-                
-                # Schedule the first frame update
-                self.root.after(0, update_preview)
-                
-            except Exception as e:
-                print(f"Erro ao iniciar thread de preview: {e}")
-                self.preview_playing = False
-                self.play_btn['state'] = 'normal'
-                # Stop audio on error
-                if pygame.mixer.music.get_busy():
-                    pygame.mixer.music.stop()
-
-        self.preview_thread = threading.Thread(target=start_preview_thread)
-        self.preview_thread.daemon = True
-        self.preview_thread.start()
+            photo.paste(image)
+
+    def _display_preview_item(self, reader, item):
+        self._show_preview_canvas(item.canvas)
+        if self.preview_current is not None:
+            reader.release(self.preview_current)
+        self.preview_current = item
+        # Update playback progress bar
+        self._update_playback_progress(item.frame_number + 1, self.total_preview_frames)
+
+    def _preview_size(self):
+        return self.preview_label.winfo_width(), self.preview_label.winfo_height()
+
+    def _present_preview_frame(self):
+        """Apresenta o frame mais recente já vencido e agenda a próxima apresentação"""
+        self.preview_job = None
+        reader = self.preview_reader
+        if reader is None or not self.preview_playing:
+            return
+        try:
+            reader.target_size = self._preview_size()
+            reader.buffer.discard_before(self.preview_min_loop)
+            upcoming = reader.buffer.peek()
+            if upcoming is not None and upcoming.loop != self.preview_loop:
+                # Novo trecho (o vídeo voltou ao início ou houve seek): áudio e relógio recomeçam nele
+                self.preview_loop = upcoming.loop
+                if self.preview_audio is not None:
+                    self.preview_audio.play(upcoming.frame_number * reader.frame_interval)
+                self.preview_clock.restart_audio(upcoming.timestamp)
+            item, dropped = reader.buffer.pop_due(self.preview_clock.time())
+            # Frames atrasados são descartados em vez de acumular atraso
+            self.preview_dropped_frames += dropped
+            if dropped:
+                profiler.count('preview_dropped', dropped)
+            if item is not None:
+                drift = self.preview_clock.record_presentation(item.timestamp)
+                if drift > self.preview_clock.tolerance and len(reader.buffer) == 0:
+                    # A decodificação não acompanha o relógio: pula frames até alcançá-lo
+                    reader.skip_until(self.preview_clock.time() + self.preview_clock.tolerance)
+                self._display_preview_item(reader, item)
+                self._update_sync_label(reader)
+            elif reader.finished.is_set() and len(reader.buffer) == 0:
+                if reader.error is not None:
+                    self.stop_preview()
+                    messagebox.showwarning("Aviso", "Não foi possível abrir o vídeo para preview!")
+                return
+
+            # Agenda a próxima apresentação para o instante do próximo frame
+            upcoming = reader.buffer.peek()
+            if upcoming is not None:
+                delay = upcoming.timestamp - self.preview_clock.time()
+            else:
+                delay = reader.frame_interval / 2  # Buffer vazio: a decodificação está atrasada
+            self.preview_job = self.root.after(max(1, int(delay * 1000)), self._present_preview_frame)
+        except Exception as e:
+            print(f"Erro no preview: {e}")
+            self.preview_playing = False # Ensure preview stops on error
+            # Stop audio on error
+            self._stop_preview_audio()
+            # Reset progress bar on error
+            self._update_playback_progress(0, self.total_preview_frames)
 
     def stop_preview(self):
         """Para a reprodução do preview"""
         self.preview_playing = False
+        for job in (self.preview_job, self.scrub_job, self.seek_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.preview_job = self.scrub_job = self.seek_job = None
         
         # Para o áudio
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
+        self._stop_preview_audio()
         
-        # Libera o VideoCapture do preview
+        # Encerra a thread de decodificação do preview
         with self.preview_lock:
-            if self.preview_cap is not None:
-                self.preview_cap.release()
-                self.preview_cap = None
+            reader = self.preview_reader
+            self.preview_reader = None
+        if reader is not None:
+            reader.stop()
+        self.preview_current = None
         
         # Update button state when preview stops
         self.play_btn['state'] = 'normal'
 
         # Reset progress bar when preview stops
-        self.root.after(0, lambda: self._update_playback_progress(0, self.total_preview_frames))
+        self._update_playback_progress(0, self.total_preview_frames)
 
-        # No need to join the thread here as it only schedules the first call
-        # The scheduled calls will stop when preview_playing is False
 
     def _validate_video_file(self):
         if not self.video_path or not os.path.exists(self.video_path):
@@ -347,15 +608,28 @@ class VideoPlayerApp:
 
     def pause_video(self):
         self.preview_playing = False
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.pause()
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+            self.preview_job = None
+        if self.preview_clock is not None:
+            self.preview_clock.pause()
+        if self.preview_audio is not None:
+            self.preview_audio.pause()
 
     def resume_video(self):
-        self.preview_playing = True
-        if not self.preview_thread or not self.preview_thread.is_alive():
+        if self.preview_reader is None:
             self.show_preview()
-        else:
-            pygame.mixer.music.unpause()
+            return
+        if self.preview_playing:
+            return
+        self.preview_playing = True
+        if self.seek_job is not None:
+            self.root.after_cancel(self.seek_job)
+            self.seek_job = None
+        self.preview_clock.resume()
+        if self.preview_audio is not None:
+            self.preview_audio.resume()
+        self._present_preview_frame()
             
     def stop_video(self):
         self.stop_preview()
@@ -365,107 +639,147 @@ class VideoPlayerApp:
             if self.cap:
                 self.cap.release()
                 self.cap = None
-        cv2.destroyAllWindows()
 
     def edit_video(self):
         messagebox.showinfo("Informação", "Funcionalidade de edição será implementada em breve!")
 
     def quit_app(self):
+        self.index_stop.set()
+        # Extrações interrompidas são retomadas na próxima vez (frames já gravados são pulados)
+        if self._extraction_queue is not None:
+            self._extraction_queue.cancel()
         self.stop_preview()
         self.stop_video()
-        if self.temp_audio_file and os.path.exists(self.temp_audio_file):
-            pygame.mixer.music.unload()  # Garantir que o arquivo de áudio seja liberado
-            try:
-                os.remove(self.temp_audio_file)
-            except:
-                pass
-        pygame.quit()
+        if self.preview_audio is not None:
+            # Decodificação incompleta não é marcada como concluída e será refeita na próxima vez
+            self.preview_audio.decoded.cancel()
+        pygame = sys.modules.get('pygame')
+        if pygame is not None:
+            pygame.quit()
         self.root.quit()
         self.root.destroy()
 
-    def save_frame(self, frame, frame_path):
-        """Salva um frame individual como arquivo TIFF"""
-        cv2.imwrite(frame_path, frame, [cv2.IMWRITE_TIFF_COMPRESSION, cv2.IMWRITE_TIFF_COMPRESSION_DEFLATE])
-
     def extract_frames(self):
         if not self._validate_video_file():
             return
         output_dir = filedialog.askdirectory(title="Selecione a pasta para salvar os frames")
         if not output_dir:
             return
-        threading.Thread(target=self._extract_frames_worker, args=(output_dir,)).start()
-
-    def _extract_frames_worker(self, output_dir):
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
-        BATCH_SIZE = 50
-        cap = None
+        self._start_batch()
+        # A decodificação e gravação ficam no motor headless (extractor.py), via fila (jobs.py)
+        self.copy_video_jobs.add(self.extraction_queue.add(self.video_path, output_dir))
+
+    def extract_folder(self):
+        source_dir = filedialog.askdirectory(title="Selecione a pasta com os vídeos")
+        if not source_dir:
+            return
+        output_dir = filedialog.askdirectory(title="Selecione a pasta para salvar os frames")
+        if not output_dir:
+            return
+        self._start_batch()
+        if not self.extraction_queue.add_paths([source_dir], output_dir):
+            messagebox.showinfo("Informação", "Nenhum vídeo encontrado na pasta selecionada.")
+
+    def _start_batch(self):
+        # Um novo lote começa quando a fila está parada: a vazão agregada volta a contar do zero
+        if self.extraction_queue.idle:
+            self.extraction_queue.clear_finished()
+            self.extraction_rate.reset()
+
+    # Os dois métodos abaixo rodam nas threads da fila: apenas publicam no canal, sem tocar no Tk
+    def _on_extraction_progress(self, job):
+        self.progress_channel.update('extraction', job)
+
+    def _on_extraction_job_done(self, job):
+        self.progress_channel.post(job)
+
+    def _refresh_ui(self):
+        """Aplica o progresso publicado pelas threads de trabalho e se reagenda (UI_REFRESH_MS)"""
         try:
-            cap = cv2.VideoCapture(self.video_path)
-            if not cap.isOpened():
-                self.root.after(0, lambda: messagebox.showerror("Erro", "Erro ao abrir o vídeo!"))
-                return
-            video_name = os.path.splitext(os.path.basename(self.video_path))[0].replace(' ', '_')
-            video_name = video_name.replace("'", "").replace(":", "").replace(";", "").replace("-", "").replace("–", "").replace("—", "").replace(".", "")
-            output_dir = os.path.join(output_dir, video_name)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            frame_count = 0
-            batch_frames = []
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                frame_path = os.path.join(output_dir, f"{video_name}_{frame_count:04d}.tiff")
-                batch_frames.append((frame.copy(), frame_path))
-                frame_count += 1
-                if len(batch_frames) >= BATCH_SIZE:
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-                        futures = [executor.submit(self.save_frame, frame, path) for frame, path in batch_frames]
-                        concurrent.futures.wait(futures)
-                    batch_frames.clear()
-                # Atualiza barra de progresso
-                self._update_progress(frame_count, total_frames)
-            if batch_frames:
-                with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-                    futures = [executor.submit(self.save_frame, frame, path) for frame, path in batch_frames]
-                    concurrent.futures.wait(futures)
-            # Copia o vídeo se desejado
-            def copy_video():
-                if messagebox.askyesno("Copiar Arquivo de Vídeo", 
-                                     "Deseja copiar o arquivo de vídeo original para a pasta de destino?"):
-                    video_filename = os.path.basename(self.video_path)
-                    video_destination = os.path.join(output_dir, video_filename)
+            latest, finished_jobs = self.progress_channel.drain()
+            if 'extraction' in latest:
+                self._show_extraction_progress(latest['extraction'])
+            for job in finished_jobs:
+                self._finish_extraction_job(job)
+            self._apply_playback_progress()
+        finally:
+            self.root.after(UI_REFRESH_MS, self._refresh_ui)
+
+    def _finish_extraction_job(self, job):
+        from jobs import DONE, FAILED
+        ask_copy = job in self.copy_video_jobs
+        self.copy_video_jobs.discard(job)
+        if job.status == FAILED:
+            messagebox.showerror("Erro", f"Erro durante a extração de {os.path.basename(job.video_path)}: "
+                                         f"{str(job.error)}")
+        elif job.status == DONE and ask_copy:
+            self._copy_video(job)
+        extraction_queue = self.extraction_queue
+        if extraction_queue.idle:
+            self._update_progress(extraction_queue.frames_done, extraction_queue.total_frames)
+            self.progress_label.config(
+                text=f"Extração concluída: {extraction_queue.frames_done} frames, "
+                     f"{format_bytes(extraction_queue.bytes_written)} em "
+                     f"{format_duration(extraction_queue.elapsed)} "
+                     f"({extraction_queue.frames_per_second:.1f} frames/s)")
+            if len(extraction_queue.jobs) > 1:
+                finished = sum(1 for queued in extraction_queue.jobs if queued.status == DONE)
+                messagebox.showinfo("Sucesso", f"Lote concluído!\n{finished}/{len(extraction_queue.jobs)} vídeos, "
+                                               f"{extraction_queue.frames_done} frames "
+                                               f"({extraction_queue.frames_per_second:.1f} frames/s)")
+
+    def _copy_video(self, job):
+        """Copia o vídeo original para a pasta dos frames, se desejado"""
+        video_path = job.video_path
+        output_dir = job.stats.output_dir
+        video_name = os.path.basename(output_dir)
+        try:
+            if messagebox.askyesno("Copiar Arquivo de Vídeo",
+                                   "Deseja copiar o arquivo de vídeo original para a pasta de destino?"):
+                video_filename = os.path.basename(video_path)
+                video_destination = os.path.join(output_dir, video_filename)
+                if os.path.exists(video_destination):
+                    os.remove(video_destination)
+                    video_destination = os.path.join(output_dir, f"{video_name}.mp4")
                     if os.path.exists(video_destination):
                         os.remove(video_destination)
-                        video_destination = os.path.join(output_dir, f"{video_name}.mp4")
-                        if os.path.exists(video_destination):
-                            os.remove(video_destination)
-                    shutil.copy2(self.video_path, video_destination)
-                messagebox.showinfo("Sucesso", f"Extração concluída!\nFrames salvos em:\n{output_dir}")
-                self._update_progress(total_frames, total_frames)
-            self.root.after(0, copy_video)  # Adicionado after para evitar problemas de UI
+                shutil.copy2(video_path, video_destination)
         except PermissionError:
             messagebox.showerror("Erro", "Não foi possível mover o arquivo de vídeo. Ele pode estar em uso.")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro durante a extração: {str(e)}")
-        finally:
-            if cap is not None:
-                cap.release()
-            cv2.destroyAllWindows()
-            # ADICIONE ISSO APÓS O finally:
-            self.cap = cv2.VideoCapture(self.video_path)
+            return
+        messagebox.showinfo("Sucesso", f"Extração concluída!\nFrames salvos em:\n{output_dir}")
 
     def _update_playback_progress(self, current_frame, total_frames):
-        """Update the video playback progress bar and label"""
+        """Registra a posição do preview; a barra é atualizada em _refresh_ui"""
+        self.playback_progress = (current_frame, total_frames)
+
+    def _apply_playback_progress(self):
+        if self.playback_progress is None:
+            return
+        current_frame, total_frames = self.playback_progress
+        self.playback_progress = None
         if total_frames > 0:
             progress = (current_frame / total_frames) * 100
             self.video_progress_var.set(progress)
+            self._move_playhead(current_frame / total_frames)
         else:
             self.video_progress_var.set(0)
-        self.root.update_idletasks()
+            self._move_playhead(0)
+
+    def _show_extraction_progress(self, job):
+        """Progresso agregado da fila de extração: vazão recente, bytes gravados e tempo restante"""
+        extraction_queue = self.extraction_queue
+        done, total, written = extraction_queue.frames_done, extraction_queue.total_frames, extraction_queue.bytes_written
+        self.extraction_rate.add(done, written)
+        frame_rate, byte_rate = self.extraction_rate.rates()
+        eta = self.extraction_rate.eta(done, total)
+        finished = sum(1 for queued in extraction_queue.jobs if queued.finished is not None)
+        self.progress_var.set(done / total * 100 if total > 0 else 0)
+        self.progress_label.config(
+            text=f"Extraindo {os.path.basename(job.video_path)}: {job.frames_done}/{job.total_frames} | "
+                 f"vídeos: {finished}/{len(extraction_queue.jobs)} | {frame_rate:.1f} frames/s | "
+                 f"{format_bytes(byte_rate)}/s | {format_bytes(written)} gravados | "
+                 f"restante: {format_duration(eta) if eta is not None else '--:--'}")
 
     def _update_progress(self, current_frame, total_frames):
         """Update the extraction progress bar and label"""
@@ -476,9 +790,18 @@ class VideoPlayerApp:
         else:
             self.progress_var.set(0)
             self.progress_label.config(text="")
-        self.root.update_idletasks()
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Player e extrator de frames de vídeo.")
+    parser.add_argument('--startup-time', action='store_true',
+                        help="Mede a inicialização (janela na tela e subsistemas carregados), imprime em JSON e sai")
+    args = parser.parse_args(argv)
     root = tk.Tk()
     app = VideoPlayerApp(root)
+    if args.startup_time:
+        app.report_startup()
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()